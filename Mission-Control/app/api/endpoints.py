@@ -1,62 +1,251 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
-from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlmodel import Session, and_, func, or_, select
 from app.core.database import get_session
-from app.models.models import Survivor, MissionLog
+from app.models.models import Survivor, MissionLog, SurvivorStatus
 from app.services.mission.coordinator import coordinator
-from app.services.detector import streamer
-from app.services.planner import solve_tsp
+from app.services.detector import streamer, streams
+from app.services.broadcaster import broadcaster
+from app.services.captures import capture_writer
+from app.services.inference import inference_service
+from app.services.rate_control import cpu_monitor
 from app.core.config import settings
+from datetime import datetime, timezone
+from typing import Callable, Optional, Union
+import hashlib
+import json
 import time
 
 router = APIRouter()
 
+class StreamConfig(BaseModel):
+    # Used in route paths and capture filenames, so no separators, dots or spaces
+    stream_id: str = Field(pattern=r"^[A-Za-z0-9_-]{1,32}$")
+    source: Union[int, str] # Webcam index, RTSP/HTTP URL or video file
+    autostart: bool = False
+
+SURVIVOR_FIELDS = tuple(Survivor.model_fields)
+
+def _etag(*parts) -> str:
+    """Weak validator over whatever determines a response (not its exact bytes, e.g. mission_time)."""
+    digest = hashlib.sha1(json.dumps(jsonable_encoder(parts), sort_keys=True).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+def _conditional(request: Request, etag: str, build: Callable) -> Response:
+    """304 if the client already has this version, otherwise the built body with its ETag."""
+    tags = {t.strip() for t in request.headers.get("if-none-match", "").split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(jsonable_encoder(build()), headers={"ETag": etag})
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are UTC; SQLite keeps the wall time without an offset, so naive cursors are UTC too
+    if value is not None:
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    return value
+
+def _parse_fields(fields: Optional[str]):
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in SURVIVOR_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown survivor fields: {', '.join(unknown)}")
+    # The cursor columns are always included
+    return ["id", "updated_at"] + [f for f in selected if f not in ("id", "updated_at")]
+
+def _get_stream(stream_id: str):
+    stream = streams.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    return stream
+
 @router.get("/video_feed")
 def video_feed():
     return StreamingResponse(streamer.generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
 
-@router.get("/status")
-def get_status(session: Session = Depends(get_session)):
-    survivors = session.exec(select(Survivor)).all()
+@router.get("/video_feed/{stream_id}")
+def stream_video_feed(stream_id: str):
+    stream = _get_stream(stream_id)
+    return StreamingResponse(stream.generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+@router.get("/streams")
+def list_streams():
+    return streams.list()
+
+@router.post("/streams", status_code=201)
+def add_stream(config: StreamConfig):
+    try:
+        stream = streams.add(config.stream_id, config.source)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if config.autostart:
+        stream.start()
+    return stream.info()
+
+@router.delete("/streams/{stream_id}")
+def remove_stream(stream_id: str):
+    if stream_id == streamer.stream_id:
+        raise HTTPException(status_code=400, detail="The main stream follows the camera settings and can't be removed")
+    if not streams.remove(stream_id):
+        raise HTTPException(status_code=404, detail="Stream not found")
+    return {"status": f"Stream {stream_id} removed"}
+
+@router.post("/streams/{stream_id}/start")
+def start_stream(stream_id: str):
+    stream = _get_stream(stream_id)
+    stream.start()
+    return stream.info()
+
+@router.post("/streams/{stream_id}/stop")
+def stop_stream(stream_id: str):
+    stream = _get_stream(stream_id)
+    stream.stop()
+    return stream.info()
+
+@router.get("/inference/stats")
+def get_inference_stats():
+    """Shared model batching, each stream's effective FPS and skip ratio, and the crop writer's counters."""
     return {
-        "scout": coordinator.scout.get_telemetry(),
-        "delivery": coordinator.delivery.get_telemetry(),
-        "survivors": survivors,
-        "mission_time": time.time() - coordinator.start_time
+        "cpu_load": round(cpu_monitor.load(), 3),
+        "service": inference_service.stats(),
+        "captures": capture_writer.stats(),
+        "streams": {s["id"]: s["inference"] for s in streams.list()},
     }
 
+@router.get("/status")
+def get_status(request: Request, since: Optional[datetime] = None, since_id: Optional[int] = None,
+               limit: Optional[int] = Query(None, ge=1, le=settings.STATUS_PAGE_MAX), fields: Optional[str] = None,
+               session: Session = Depends(get_session)):
+    """
+    Drone telemetry and survivors.
+    since: only survivors created or changed at/after this time, ordered by (updated_at, id);
+        pass back next_since and next_since_id together to continue after the last row.
+    since_id alone: only survivors with a larger id, ordered by id; next_since_id continues
+        and next_since stays null. has_more says whether another page is waiting.
+    limit: page size; fields: comma-separated survivor columns to return (id and updated_at always included).
+    Answers 304 to If-None-Match when neither telemetry nor any survivor changed.
+    """
+    columns = _parse_fields(fields)
+    since = _utc(since)
+    scout, delivery = coordinator.scout.get_telemetry(), coordinator.delivery.get_telemetry()
+    total, last_change = session.exec(select(func.count(Survivor.id), func.max(Survivor.updated_at))).one()
+    etag = _etag(scout, delivery, total, last_change, since, since_id, limit, columns)
+
+    def build():
+        statement = select(*[getattr(Survivor, c) for c in columns]) if columns else select(Survivor)
+        if since is not None:
+            # Keyset on (updated_at, id): rows changed later, or at the same instant after the last id seen
+            if since_id is not None:
+                statement = statement.where(or_(Survivor.updated_at > since,
+                                                and_(Survivor.updated_at == since, Survivor.id > since_id)))
+            else:
+                statement = statement.where(Survivor.updated_at >= since)
+            statement = statement.order_by(Survivor.updated_at, Survivor.id)
+        else:
+            statement = statement.order_by(Survivor.id)
+            if since_id is not None:
+                statement = statement.where(Survivor.id > since_id)
+        if limit is not None:
+            statement = statement.limit(limit + 1) # One extra row tells whether there is another page
+        rows = session.exec(statement).all()
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if has_more else rows
+        survivors = [dict(zip(columns, row)) for row in rows] if columns else rows
+        last = (survivors[-1]["id"], survivors[-1]["updated_at"]) if columns and rows else \
+            (rows[-1].id, rows[-1].updated_at) if rows else (since_id, since)
+        if since is None:
+            last = (last[0], None) # Id-ordered pages: a change-time cursor would skip rows
+        return {
+            "scout": scout,
+            "delivery": delivery,
+            "survivors": survivors,
+            "survivor_count": total,
+            "next_since_id": last[0],
+            "next_since": last[1],
+            "has_more": has_more,
+            "mission_time": time.time() - coordinator.start_time
+        }
+
+    return _conditional(request, etag, build)
+
+@router.websocket("/ws")
+async def telemetry_socket(websocket: WebSocket):
+    """Snapshot on connect, then telemetry at TELEMETRY_RATE and survivor/log deltas as they are saved."""
+    await broadcaster.serve(websocket)
+
 @router.post("/mission/start_scan")
 def start_scan():
     coordinator.start_scan()
-    streamer.start()
+    streams.start_all()
     return {"status": "Scan started"}
 
 @router.post("/mission/stop_scan")
 def stop_scan():
     coordinator.stop_scan()
-    streamer.stop()
+    streams.stop_all()
     return {"status": "Scan stopped"}
 
 @router.post("/mission/deploy_delivery")
 def deploy_delivery(background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
-    survivors = session.exec(select(Survivor)).all()
+    survivors = session.exec(select(Survivor).where(Survivor.status != SurvivorStatus.DELIVERED)).all()
     if not survivors:
         return {"status": "No survivors to deliver to"}
     
-    # Calculate route
-    points = [(s.lat, s.lon) for s in survivors]
-    # Add home base as start
-    home = (coordinator.delivery.telemetry.lat, coordinator.delivery.telemetry.lon)
-    points.insert(0, home)
-    
-    path_indices = solve_tsp(points, start_index=0)
+    # Calculate route: kit/range-limited trips from home base
+    plan = coordinator.plan_delivery(survivors)
+    trips = [[survivors[i].id for i in trip.stops] for trip in plan.trips]
     
     # Deploy
-    coordinator.deploy_delivery(path_indices)
+    coordinator.deploy_delivery(trips)
+    
+    # path indexes [home] + survivors, returning to home (0) after every trip
+    path_indices = [0]
+    for trip in plan.trips:
+        path_indices += [i + 1 for i in trip.stops] + [0]
     
-    return {"status": "Delivery Drone Deployed", "path": path_indices}
+    return {
+        "status": "Delivery Drone Deployed",
+        "path": path_indices,
+        "trips": trips,
+        "unreachable": [survivors[i].id for i in plan.unserved],
+        "total_distance_m": round(plan.total_distance, 1),
+    }
+
+@router.get("/mission/plan")
+def get_plan():
+    """Current delivery plan over undelivered survivors, kept up to date as detections arrive."""
+    order, length, plan = coordinator.current_plan()
+    return {
+        "order": order,
+        "tour_length_m": round(length, 1),
+        "trips": [[order[i] for i in trip.stops] for trip in plan.trips] if plan else [],
+        "unreachable": [order[i] for i in plan.unserved] if plan else [],
+        "total_distance_m": round(plan.total_distance, 1) if plan else 0.0,
+    }
 
 @router.get("/logs")
-def get_logs(session: Session = Depends(get_session)):
-    logs = session.exec(select(MissionLog).order_by(MissionLog.timestamp.desc()).limit(50)).all()
-    return logs
+def get_logs(request: Request, since_id: Optional[int] = None, since: Optional[datetime] = None,
+             limit: int = Query(50, ge=1, le=settings.LOGS_PAGE_MAX), session: Session = Depends(get_session)):
+    """
+    Without a cursor: the latest `limit` logs, newest first.
+    since_id / since: logs after that id / timestamp, oldest first, so the last entry's id
+    is the next cursor. Answers 304 to If-None-Match when no log was added or pruned.
+    """
+    since = _utc(since)
+    newest, oldest = session.exec(select(func.max(MissionLog.id), func.min(MissionLog.id))).one()
+    etag = _etag(newest, oldest, since_id, since, limit)
+
+    def build():
+        if since_id is None and since is None:
+            return session.exec(select(MissionLog).order_by(MissionLog.timestamp.desc()).limit(limit)).all()
+        statement = select(MissionLog).order_by(MissionLog.id).limit(limit)
+        if since_id is not None:
+            statement = statement.where(MissionLog.id > since_id)
+        if since is not None:
+            statement = statement.where(MissionLog.timestamp > since)
+        return session.exec(statement).all()
+
+    return _conditional(request, etag, build)
@@ -1,33 +1,82 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from app.services.simulation.engine import simulation_engine
+from app.services.simulation.jobs import job_manager, JobQueueFull, SimulationJob
+from app.services.simulation.occupancy import OBSTACLE_MODES
+from app.services.simulation.params import SimulationParams
 import shutil
 import os
 import uuid
+from typing import List, Optional
 
 router = APIRouter()
 
-@router.post("/run")
-def run_simulation_endpoint(file: UploadFile = File(...), single_drone_mode: bool = Form(False)):
-    # Save temp file
-    file_ext = file.filename.split('.')[-1]
-    temp_filename = f"temp_{uuid.uuid4()}.{file_ext}"
-    temp_path = os.path.join("app/static/simulations", temp_filename)
-    
-    # Ensure dir exists
+@router.post("/run", status_code=202, response_model=SimulationJob)
+def run_simulation_endpoint(
+    file: UploadFile = File(...),
+    single_drone_mode: bool = Form(False),
+    output_width: Optional[int] = Form(None),
+    frame_stride: int = Form(1),
+    max_video_seconds: Optional[float] = Form(None),
+    headless: bool = Form(False),
+    no_fly_mask: Optional[UploadFile] = File(None),
+    grid_scale: int = Form(SimulationParams().grid_scale),
+    obstacle_mode: str = Form("none"),
+    obstacle_threshold: int = Form(SimulationParams().obstacle_threshold),
+):
+    if output_width is not None and output_width < 16:
+        raise HTTPException(status_code=400, detail="output_width must be at least 16 pixels")
+    if frame_stride < 1:
+        raise HTTPException(status_code=400, detail="frame_stride must be >= 1")
+    if max_video_seconds is not None and max_video_seconds <= 0:
+        raise HTTPException(status_code=400, detail="max_video_seconds must be positive")
+    if grid_scale < 1:
+        raise HTTPException(status_code=400, detail="grid_scale must be >= 1")
+    if obstacle_mode not in OBSTACLE_MODES:
+        raise HTTPException(status_code=400, detail=f"obstacle_mode must be one of {', '.join(OBSTACLE_MODES)}")
+
+    # Save temp files; the worker deletes them once the job has finished with them
     os.makedirs("app/static/simulations", exist_ok=True)
-    
+    temp_path = _save_upload(file)
+    mask_path = _save_upload(no_fly_mask) if no_fly_mask is not None and no_fly_mask.filename else None
+
+    params = SimulationParams(grid_scale=grid_scale, obstacle_mode=obstacle_mode, obstacle_threshold=obstacle_threshold)
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        result = simulation_engine.run_simulation(temp_path, single_drone_mode=single_drone_mode)
-        return result
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Clean up input image if needed, or keep it for reference
-        # For now we keep it or maybe delete it. Let's delete to save space.
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        return job_manager.submit(
+            temp_path,
+            single_drone_mode=single_drone_mode,
+            output_width=output_width,
+            frame_stride=frame_stride,
+            max_video_seconds=max_video_seconds,
+            headless=headless,
+            params=params,
+            no_fly_mask=mask_path,
+        )
+    except JobQueueFull as e:
+        for path in (temp_path, mask_path):
+            if path:
+                os.remove(path)
+        raise HTTPException(status_code=429, detail=str(e))
+
+def _save_upload(upload: UploadFile) -> str:
+    file_ext = upload.filename.split('.')[-1]
+    temp_path = os.path.join("app/static/simulations", f"temp_{uuid.uuid4()}.{file_ext}")
+    with open(temp_path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+    return temp_path
+
+@router.get("/jobs", response_model=List[SimulationJob])
+def list_jobs():
+    return job_manager.list()
+
+@router.get("/jobs/{job_id}", response_model=SimulationJob)
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/jobs/{job_id}", response_model=SimulationJob)
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -13,8 +13,53 @@ class Settings:
     # Example coords
     DEFAULT_LAT: float = 28.6139
     DEFAULT_LON: float = 77.2090
+    SURVIVOR_DEDUP_RADIUS: float = 10.0  # Metres within which a detection is the same survivor
     
     # Model
     MODEL_PATH: str = "best.pt"  # Assumes model is in root or accessible
+    INFERENCE_MAX_BATCH: int = 8  # Frames from different streams run through the model together
+    INFERENCE_MAX_DELAY: float = 0.02  # Seconds a batch waits for other streams' frames
+    FRAME_CHANGE_THRESHOLD: float = 0.005  # Fraction of changed thumbnail pixels below which a frame is skipped
+    FRAME_MAX_SKIP_INTERVAL: float = 2.0  # Seconds after which an unchanged frame is inferred anyway
+
+    # Person tracking (see services/tracking.py)
+    TRACK_IOU_THRESHOLD: float = 0.3  # Overlap needed to continue a track
+    TRACK_MAX_AGE: float = 3.0  # Seconds a track survives unseen
+    TRACK_MIN_HITS: int = 2  # Detections before a track is registered as a survivor
+    TRACK_CONF_IMPROVEMENT: float = 0.1  # Confidence gain that refreshes a track's saved crop
+
+    # Survivor crops (see services/captures.py)
+    CAPTURE_DIR: str = "app/static/captures"
+    CAPTURE_QUEUE_SIZE: int = 64  # Crops waiting to be written before new ones are dropped
+    CAPTURE_JPEG_QUALITY: int = 90
+    CAPTURE_MAX_SIZE: int = 512  # Longest side in pixels; larger crops are downscaled
+
+    # Write-behind persistence (see services/persistence.py)
+    PERSIST_FLUSH_INTERVAL: float = 0.5  # Seconds between batched commits
+    PERSIST_BATCH_SIZE: int = 200  # Pending changes that trigger an early commit
+    PERSIST_MAX_PENDING: int = 5000  # Survivor changes / log rows held (each) before new ones are dropped
+    PERSIST_MAX_ATTEMPTS: int = 5  # Failed write cycles before a survivor change is given up
+    
+    # Dashboard push updates (see services/broadcaster.py)
+    TELEMETRY_RATE: float = 2.0  # Telemetry messages per second over /api/ws
+    WS_SEND_TIMEOUT: float = 2.0  # Seconds before a viewer that can't keep up is disconnected
+    WS_SNAPSHOT_LOGS: int = 50  # Recent logs sent to a viewer when it connects
+    
+    # Polling APIs
+    STATUS_PAGE_MAX: int = 1000  # Largest survivor page /api/status returns
+    LOGS_PAGE_MAX: int = 500  # Largest page /api/logs returns
+    
+    # Database (see core/database.py)
+    DB_POOL_SIZE: int = 8  # Connections kept open for the worker threads and API requests
+    DB_MAX_OVERFLOW: int = 8  # Extra connections allowed under bursts
+    DB_BUSY_TIMEOUT: float = 5.0  # Seconds a writer waits for the database lock
+    LOG_RETENTION_DAYS: float = 7  # Mission logs older than this are pruned
+    LOG_MAX_ROWS: int = 100000  # Newest mission logs kept
+    DB_MAINTENANCE_INTERVAL: float = 3600  # Seconds between log pruning / WAL checkpoints
+    
+    # Simulation jobs
+    SIMULATION_WORKERS: int = 2  # Processes running simulations in parallel
+    SIMULATION_MAX_PENDING_JOBS: int = 16  # Queued + running jobs before submissions are rejected
+    SIMULATION_JOB_HISTORY: int = 100  # Finished jobs kept for status queries
 
 settings = Settings()
@@ -1,14 +1,79 @@
-from sqlmodel import SQLModel, create_engine, Session
+from datetime import timedelta
+from sqlalchemy import event, inspect, text
+from sqlmodel import SQLModel, create_engine, Session, delete, select
 from app.core.config import settings
+from app.models.models import MissionLog, utc_now
 
 sqlite_file_name = "mission_control.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=False, connect_args=connect_args)
+# The detector, capture/persistence workers, delivery thread and API requests all hold
+# connections at once; busy_timeout makes writers wait on each other instead of failing
+connect_args = {"check_same_thread": False, "timeout": settings.DB_BUSY_TIMEOUT}
+engine = create_engine(sqlite_url, echo=False, connect_args=connect_args, pool_size=settings.DB_POOL_SIZE,
+                       max_overflow=settings.DB_MAX_OVERFLOW)
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL", # Readers (dashboard polls) don't block the writer
+    "synchronous": "NORMAL", # Safe with WAL; fsync at checkpoints instead of every commit
+    "busy_timeout": int(settings.DB_BUSY_TIMEOUT * 1000),
+    "cache_size": -16000, # 16 MB page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+@event.listens_for(engine, "connect")
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# Values for columns added to existing tables: (table, column) -> SQL expression over the row
+MIGRATION_BACKFILLS = {
+    ("survivor", "updated_at"): "detected_at",
+}
+
+def _migrate():
+    """Adds columns and indexes introduced after a database file was created (create_all skips existing tables)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                    backfill = MIGRATION_BACKFILLS.get((table.name, column.name))
+                    if backfill:
+                        conn.execute(text(f'UPDATE "{table.name}" SET "{column.name}" = {backfill}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    _migrate()
+
+def prune_logs(max_age_days: float = settings.LOG_RETENTION_DAYS, max_rows: int = settings.LOG_MAX_ROWS) -> int:
+    """Deletes mission logs older than max_age_days and all but the newest max_rows; returns rows removed."""
+    with Session(engine) as session:
+        cutoff = utc_now() - timedelta(days=max_age_days)
+        removed = session.exec(delete(MissionLog).where(MissionLog.timestamp < cutoff)).rowcount
+        newest = session.exec(select(MissionLog.id).order_by(MissionLog.id.desc()).offset(max_rows).limit(1)).first()
+        if newest is not None:
+            removed += session.exec(delete(MissionLog).where(MissionLog.id <= newest)).rowcount
+        session.commit()
+    return removed
+
+def maintain_database():
+    """Log retention plus compaction: fold the WAL back into the database file and refresh planner stats."""
+    removed = prune_logs()
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        conn.execute(text("PRAGMA optimize"))
+    return removed
 
 def get_session():
     with Session(engine) as session:
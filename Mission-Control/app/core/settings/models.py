@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Union
 
 class FlightCheckSettings(BaseModel):
@@ -14,6 +14,8 @@ class DroneSettings(BaseModel):
     geofence_enabled: bool = True
     obstacle_avoidance: bool = True
     flight_mode: str = "STABILIZE" # STABILIZE, LOITER, AUTO
+    kit_capacity: int = 20 # Aid kits the delivery drone carries per trip
+    max_flight_distance: int = 5000 # Metres per trip before it must return to recharge
 
 class CameraSettings(BaseModel):
     resolution: str = "1080p"
@@ -22,6 +24,10 @@ class CameraSettings(BaseModel):
     auto_record: bool = True
     ai_confidence: float = 0.5
     camera_source: Union[int, str] = 0
+    tile_size: int = Field(0, ge=0) # Sliced inference tile in pixels for high-resolution feeds, 0 = whole frame
+    tile_overlap: float = Field(0.2, ge=0, lt=1) # Fraction of a tile shared with its neighbour
+    inference_fps: float = Field(10, gt=0) # Upper bound on detector runs per second per stream
+    cpu_budget: float = 0.5 # Fraction of all cores this process may use before inference backs off
 
 class MavlinkSettings(BaseModel):
     connection_string: str = "udp:127.0.0.1:14550"
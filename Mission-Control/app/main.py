@@ -4,17 +4,35 @@ from fastapi.templating import Jinja2Templates
 from contextlib import asynccontextmanager
 from app.api import endpoints, settings as settings_api, simulation
 from app.core.config import settings
-from app.services.detector import streamer
-from app.core.database import create_db_and_tables
+from app.services.captures import capture_writer
+from app.services.detector import streams
+from app.services.persistence import persistence
+from app.services.simulation.jobs import job_manager
+from app.core.database import create_db_and_tables, maintain_database
+import asyncio
 import uvicorn
 
+async def database_maintenance():
+    """Prunes old logs and checkpoints the WAL periodically over long deployments."""
+    while True:
+        try:
+            await asyncio.to_thread(maintain_database)
+        except Exception as e:
+            print(f"Database maintenance failed: {e}")
+        await asyncio.sleep(settings.DB_MAINTENANCE_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     create_db_and_tables()
+    maintenance = asyncio.create_task(database_maintenance())
     yield
     # Shutdown
-    streamer.stop()
+    maintenance.cancel()
+    streams.stop_all()
+    capture_writer.stop()
+    persistence.stop() # After the producers above have stopped, so nothing is lost
+    job_manager.shutdown()
 
 app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
 
@@ -1,25 +1,36 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
+def utc_now() -> datetime:
+    # Aware timestamps: newer sqlmodel releases refuse to store naive ones
+    return datetime.now(timezone.utc)
+
 class SurvivorStatus(str, Enum):
     DETECTED = "Detected"
     VERIFIED = "Verified"
     DELIVERED = "Kit Delivered"
 
 class Survivor(SQLModel, table=True):
+    __table_args__ = (Index("ix_survivor_cell", "cell_x", "cell_y"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     lat: float
     lon: float
     confidence: float
-    status: SurvivorStatus = Field(default=SurvivorStatus.DETECTED)
-    detected_at: datetime = Field(default_factory=datetime.utcnow)
+    status: SurvivorStatus = Field(default=SurvivorStatus.DETECTED, index=True)
+    detected_at: datetime = Field(default_factory=utc_now)
+    updated_at: Optional[datetime] = Field(default_factory=utc_now, index=True) # Cursor for ?since= polling
     image_path: Optional[str] = None
+    # Dedup grid bucket in metres from the map centre (see SurvivorIndex)
+    cell_x: Optional[int] = None
+    cell_y: Optional[int] = None
 
 class MissionLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now, index=True)
     level: str = "INFO" # INFO, WARNING, ERROR
     message: str
     drone_id: Optional[str] = None
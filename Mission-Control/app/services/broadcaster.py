@@ -0,0 +1,147 @@
+"""
+Push updates for the dashboard over one WebSocket per viewer.
+
+One broadcaster serves every viewer: each tick it serializes the drone telemetry and
+any survivor/log changes once and sends the same text to all sockets, so the cost
+doesn't grow with the number of viewers. Changes come from the persistence worker
+after each commit (no polling queries); a viewer reads the database once, for its
+initial snapshot.
+"""
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from fastapi import WebSocket
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import MissionLog, Survivor
+from app.services.mission.coordinator import coordinator
+from app.services.persistence import persistence
+
+
+class _Viewer:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.ready = False # Snapshot sent; until then deltas are held in the backlog
+        self.backlog: List[str] = []
+
+
+class Broadcaster:
+    def __init__(self, rate: float = settings.TELEMETRY_RATE, send_timeout: float = settings.WS_SEND_TIMEOUT):
+        self.rate = rate
+        self.send_timeout = send_timeout
+        self._viewers: Dict[int, _Viewer] = {}
+        self._survivors: Dict[int, dict] = {} # Changed since the last tick, by id
+        self._logs: List[dict] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_telemetry = None
+        self.messages = 0
+        persistence.add_listener(self._on_persisted)
+
+    @property
+    def viewers(self) -> int:
+        return len(self._viewers)
+
+    def _on_persisted(self, survivors: List[Survivor], logs: List[MissionLog]):
+        # Runs on the persistence thread; serialize there and hand over under the lock.
+        # With nobody watching there is nothing to send: a new viewer starts from a snapshot
+        if not self._viewers:
+            return
+        changed = {s.id: s.model_dump(mode="json") for s in survivors}
+        new_logs = [log.model_dump(mode="json") for log in logs]
+        with self._lock:
+            self._survivors.update(changed)
+            self._logs.extend(new_logs)
+
+    async def serve(self, websocket: WebSocket):
+        """Handles one viewer until it disconnects."""
+        await websocket.accept()
+        viewer = _Viewer(websocket)
+        self._viewers[id(viewer)] = viewer
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            snapshot = await asyncio.to_thread(self._snapshot)
+            await websocket.send_text(json.dumps(snapshot))
+            for message in viewer.backlog:
+                await websocket.send_text(message)
+            viewer.backlog, viewer.ready = [], True
+            while True:
+                await websocket.receive_text() # Nothing expected from viewers; detects disconnects
+        except Exception:
+            pass
+        finally:
+            self._viewers.pop(id(viewer), None)
+
+    def _snapshot(self) -> dict:
+        with Session(engine) as session:
+            survivors = session.exec(select(Survivor)).all()
+            logs = session.exec(select(MissionLog).order_by(MissionLog.timestamp.desc())
+                                .limit(settings.WS_SNAPSHOT_LOGS)).all()
+            return {
+                "type": "snapshot",
+                "survivors": [s.model_dump(mode="json") for s in survivors],
+                "logs": [log.model_dump(mode="json") for log in logs],
+                **self._telemetry(),
+            }
+
+    def _telemetry(self) -> dict:
+        return {
+            "scout": coordinator.scout.get_telemetry().model_dump(mode="json"),
+            "delivery": coordinator.delivery.get_telemetry().model_dump(mode="json"),
+            "mission_time": time.time() - coordinator.start_time,
+        }
+
+    async def _run(self):
+        try:
+            while self._viewers:
+                await self._tick()
+                await asyncio.sleep(1.0 / self.rate)
+        finally:
+            self._task = None
+
+    async def _tick(self):
+        messages = []
+        telemetry = self._telemetry()
+        drones = (telemetry["scout"], telemetry["delivery"])
+        if drones != self._last_telemetry:
+            self._last_telemetry = drones
+            messages.append(json.dumps({"type": "telemetry", **telemetry}))
+
+        with self._lock:
+            survivors, self._survivors = self._survivors, {}
+            logs, self._logs = self._logs, []
+        deltas = []
+        if survivors:
+            deltas.append(json.dumps({"type": "survivors", "survivors": list(survivors.values())}))
+        if logs:
+            deltas.append(json.dumps({"type": "logs", "logs": logs}))
+
+        ready = []
+        for viewer in list(self._viewers.values()):
+            if viewer.ready:
+                ready.append(viewer)
+            else:
+                viewer.backlog.extend(deltas)
+        messages += deltas
+        if messages and ready:
+            await asyncio.gather(*(self._send(viewer, messages) for viewer in ready))
+            self.messages += len(messages)
+
+    async def _send(self, viewer: _Viewer, messages: List[str]):
+        try:
+            for message in messages:
+                await asyncio.wait_for(viewer.websocket.send_text(message), self.send_timeout)
+        except Exception:
+            # Slow or gone: drop it rather than hold back everyone else
+            self._viewers.pop(id(viewer), None)
+            try:
+                await viewer.websocket.close()
+            except Exception:
+                pass
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import uuid
+from typing import Dict, Optional
+import cv2
+import numpy as np
+from app.core.config import settings
+
+
+class CaptureWriter:
+    """
+    Writes survivor crops off the inference thread.
+
+    submit() reserves a unique filename and returns its static URL right away; a worker
+    thread downsizes, JPEG-encodes and writes the crop. Under back-pressure a newer crop
+    for a key that is still waiting (same stream and track) replaces the pending one and
+    keeps its URL, and crops for new keys are dropped once the queue is full.
+    """
+
+    def __init__(self, directory: str = settings.CAPTURE_DIR, url_prefix: str = "/static/captures",
+                 max_queue: int = settings.CAPTURE_QUEUE_SIZE, jpeg_quality: int = settings.CAPTURE_JPEG_QUALITY,
+                 max_size: int = settings.CAPTURE_MAX_SIZE):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.jpeg_quality = jpeg_quality
+        self.max_size = max_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._pending: Dict[str, list] = {} # key -> [filename, crop] still waiting to be written
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._dir_ready = False
+        self.written = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def submit(self, crop: np.ndarray, key: str) -> Optional[str]:
+        """Queues a BGR crop; returns the URL it will be served at, or None if it was dropped."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[1] = crop
+                self.coalesced += 1
+                return f"{self.url_prefix}/{pending[0]}"
+            filename = f"survivor_{key}_{uuid.uuid4().hex[:12]}.jpg"
+            item = [filename, crop]
+            try:
+                self._queue.put_nowait((key, item))
+            except queue.Full:
+                self.dropped += 1
+                return None
+            self._pending[key] = item
+        return f"{self.url_prefix}/{filename}"
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Writes whatever is queued, then stops the worker."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped,
+                "coalesced": self.coalesced, "errors": self.errors}
+
+    def _worker(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            key, item = entry
+            with self._lock:
+                # From here on a newer crop for this key starts a new file
+                self._pending.pop(key, None)
+                filename, crop = item
+            try:
+                self._write(filename, crop)
+                self.written += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing capture {filename}: {e}")
+
+    def _write(self, filename: str, crop: np.ndarray):
+        h, w = crop.shape[:2]
+        if max(h, w) > self.max_size:
+            scale = self.max_size / max(h, w)
+            crop = cv2.resize(crop, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        if not self._dir_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._dir_ready = True
+        path = os.path.join(self.directory, filename)
+        # Write then rename so the dashboard never serves a half-written file
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(path + ".tmp", path)
+
+
+capture_writer = CaptureWriter()
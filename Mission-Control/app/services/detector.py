@@ -1,23 +1,31 @@
 import cv2
 import numpy as np
-import os
-from ultralytics import YOLO
-from app.core.config import settings
+from app.core.settings.manager import settings_manager
+from app.services.captures import capture_writer
+from app.services.inference import inference_service
 from app.services.mission.coordinator import coordinator
+from app.services.rate_control import RateController
+from app.services.tiling import Detections
+from app.services.tracking import CONFIRMED, IoUTracker
 import threading
 import time
+from typing import Dict, List, Optional, Union
 
 class VideoStreamer:
-    def __init__(self, source=0):
-        self.model = YOLO(settings.MODEL_PATH)
+    def __init__(self, source=0, stream_id: str = "main"):
+        self.stream_id = stream_id # Tags this feed's frames in the shared inference batches
         self.source = source
         self.cap = None
         self.lock = threading.Lock()
         self.running = False
         self.current_frame = None
         self.latest_raw_frame = None
+        self.frame_seq = 0 # Bumped by the reader for every new frame
         self.thread = None
         self.read_thread = None
+        camera = settings_manager.get_settings().camera
+        self.rate = RateController(camera.inference_fps, camera.cpu_budget)
+        self.tracker = IoUTracker()
         
     def set_source(self, source):
         if self.source == source:
@@ -32,6 +40,7 @@ class VideoStreamer:
         if self.running:
             return
         self.running = True
+        self.tracker = IoUTracker() # Track ids don't carry over between runs or sources
         self.cap = cv2.VideoCapture(self.source)
         
         # Thread to read frames as fast as possible
@@ -48,8 +57,16 @@ class VideoStreamer:
             self.thread.join()
         if self.read_thread:
             self.read_thread.join()
+        self.thread = self.read_thread = None
         if self.cap and self.cap.isOpened():
             self.cap.release()
+        with self.lock:
+            self.current_frame = None
+            self.latest_raw_frame = None
+
+    def info(self) -> dict:
+        return {"id": self.stream_id, "source": self.source, "running": self.running,
+                "has_frame": self.current_frame is not None, "inference": self.rate.stats(), "tracks": self.tracker.active()}
 
     def _reader_loop(self):
         while self.running:
@@ -66,62 +83,84 @@ class VideoStreamer:
             
             with self.lock:
                 self.latest_raw_frame = frame
+                self.frame_seq += 1
             
             # Small sleep to prevent CPU hogging by reader
             time.sleep(0.005)
 
     def _process_loop(self):
+        seen_seq = 0
+        last_detections = Detections.from_results([])
         while self.running:
+            camera = settings_manager.get_settings().camera
+            self.rate.configure(camera.inference_fps, camera.cpu_budget)
+            wait = self.rate.wait_time()
+            if wait > 0:
+                time.sleep(min(wait, 0.05))
+                continue
+
             frame = None
             with self.lock:
-                if self.latest_raw_frame is not None:
+                if self.latest_raw_frame is not None and self.frame_seq != seen_seq:
                     frame = self.latest_raw_frame.copy()
+                    seen_seq = self.frame_seq
             
             if frame is None:
                 time.sleep(0.01)
                 continue
 
-            # Run inference
-            results = self.model(frame, verbose=False)
-            annotated_frame = results[0].plot()
+            if not self.rate.should_infer(frame):
+                # Scene unchanged: keep the feed live with the last detections drawn on
+                with self.lock:
+                    ret, buffer = cv2.imencode('.jpg', last_detections.plot(frame))
+                    if ret:
+                        self.current_frame = buffer.tobytes()
+                time.sleep(0.05)
+                continue
+
+            # Run inference (batched with the other feeds by the shared service),
+            # sliced into tiles for high-resolution feeds
+            detections = inference_service.detect(frame, stream_id=self.stream_id, tile_size=camera.tile_size,
+                                                  tile_overlap=camera.tile_overlap)
+            last_detections = detections
+            annotated_frame = detections.plot(frame)
 
-            # Process detections for mission state
-            for box in results[0].boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                if cls == 0 and conf > 0.5: # Person class
+            # Process detections for mission state: people are tracked across frames so each
+            # one is registered once and its crop is only rewritten when confidence improves
+            people = (detections.cls == 0) & (detections.conf > 0.5) # Person class
+            boxes, confs = detections.xyxy[people], detections.conf[people]
+            for track, index, event in self.tracker.update(boxes, confs):
+                crop = self._crop(frame, boxes[index])
+                if crop is None:
+                    continue
+                # Written in the background; None if the writer is backed up
+                image_path = capture_writer.submit(crop, key=f"{self.stream_id}_{track.id}")
+                if event == CONFIRMED:
                     # Simulate GPS based on drone position (mock)
                     lat = coordinator.scout.telemetry.lat + (np.random.random() - 0.5) * 0.0001
                     lon = coordinator.scout.telemetry.lon + (np.random.random() - 0.5) * 0.0001
-                    
-                    # Save image crop
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    # Clamp coordinates
-                    h, w = frame.shape[:2]
-                    x1, y1 = max(0, x1), max(0, y1)
-                    x2, y2 = min(w, x2), min(h, y2)
-                    
-                    if x2 > x1 and y2 > y1:
-                        crop = frame[y1:y2, x1:x2]
-                        timestamp = int(time.time() * 1000)
-                        filename = f"survivor_{timestamp}.jpg"
-                        
-                        # Ensure directory exists
-                        save_dir = "app/static/captures"
-                        os.makedirs(save_dir, exist_ok=True)
-                        
-                        filepath = f"{save_dir}/{filename}"
-                        cv2.imwrite(filepath, crop)
-                        
-                        # Add to state
-                        coordinator.add_survivor(lat, lon, conf, image_path=f"/static/captures/{filename}")
-            
+                    track.survivor_id = coordinator.add_survivor(lat, lon, track.best_conf, image_path=image_path)
+                elif image_path is not None:
+                    coordinator.update_survivor_image(track.survivor_id, track.best_conf, image_path)
+
             with self.lock:
                 ret, buffer = cv2.imencode('.jpg', annotated_frame)
                 if ret:
                     self.current_frame = buffer.tobytes()
-            
-            # No sleep here - run as fast as inference allows
+
+            # Pacing comes from the rate controller at the top of the loop
+
+    @staticmethod
+    def _crop(frame, box) -> Optional[np.ndarray]:
+        """Person crop (a copy, so queued crops don't pin whole frames), or None for an empty box."""
+        x1, y1, x2, y2 = map(int, box)
+        # Clamp coordinates
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2].copy()
 
     def generate_frames(self):
         while True:
@@ -150,6 +189,55 @@ class VideoStreamer:
             # Limit streaming FPS to ~20 to save bandwidth
             time.sleep(0.05)
 
-# Global streamer instance
-# In production, source might be an RTSP stream URL from the drone
-streamer = VideoStreamer(source=0) # Default to webcam for demo
+def parse_source(source: Union[int, str]) -> Union[int, str]:
+    """Webcam indices may arrive as strings ("0"); URLs and file paths are kept as-is."""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+class StreamRegistry:
+    """
+    Named camera feeds. Each stream has its own reader/processing threads and frame
+    slots, so streams start and stop independently; inference is shared (see inference.py).
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, VideoStreamer] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stream_id: str, source: Union[int, str]) -> VideoStreamer:
+        with self._lock:
+            if stream_id in self._streams:
+                raise ValueError(f"Stream '{stream_id}' already exists")
+            stream = VideoStreamer(source=parse_source(source), stream_id=stream_id)
+            self._streams[stream_id] = stream
+            return stream
+
+    def remove(self, stream_id: str) -> bool:
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return False
+        stream.stop()
+        return True
+
+    def get(self, stream_id: str) -> Optional[VideoStreamer]:
+        return self._streams.get(stream_id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            streams = list(self._streams.values())
+        return [s.info() for s in streams]
+
+    def start_all(self):
+        for stream in list(self._streams.values()):
+            stream.start()
+
+    def stop_all(self):
+        for stream in list(self._streams.values()):
+            stream.stop()
+
+# Global stream registry
+# In production, sources might be RTSP stream URLs from the drones
+streams = StreamRegistry()
+streamer = streams.add("main", source=0) # Default to webcam for demo; follows the camera_source setting
@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+from app.core.config import settings
+from app.services.tiling import Detections, slice_frame
+
+ACTIVE_STREAM_WINDOW = 1.0 # Seconds since its last frame for a stream to count as live
+
+
+class InferenceService:
+    """
+    One YOLO model shared by every camera stream (and the simulator) in this process.
+
+    Callers submit frames tagged with a stream id and get a Future for that frame's
+    Results. A single worker thread drains the queue into batches: it keeps
+    collecting until the batch is full, every live stream has a frame in it, or
+    `max_delay` has passed since the first frame, then runs the model once and
+    resolves each caller's future. Weights are loaded on the first batch.
+    """
+
+    def __init__(self, model_path: str = settings.MODEL_PATH, max_batch: int = settings.INFERENCE_MAX_BATCH,
+                 max_delay: float = settings.INFERENCE_MAX_DELAY):
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._model = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_seen: Dict[str, float] = {} # stream id -> time of its last submit
+        self._frames: Dict[str, int] = {} # stream id -> frames inferred
+        self._batches = 0
+        self._batched_frames = 0
+
+    def submit(self, frame, stream_id: str = "default") -> Future:
+        """Queues a BGR frame for inference; the future resolves to its ultralytics Results."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            self._last_seen[stream_id] = time.monotonic()
+        self._queue.put((stream_id, frame, future))
+        return future
+
+    def predict(self, frame, stream_id: str = "default", timeout: Optional[float] = None):
+        """Blocking submit()."""
+        return self.submit(frame, stream_id).result(timeout)
+
+    def detect(self, frame, stream_id: str = "default", tile_size: int = 0, tile_overlap: float = 0.2,
+               timeout: Optional[float] = None) -> Detections:
+        """
+        Detections in frame coordinates. With tile_size > 0 the frame is sliced into
+        overlapping tiles (see tiling.py) that are queued together so the worker batches
+        them (max_batch at a time), and boxes are merged across tiles.
+        """
+        h, w = frame.shape[:2]
+        if tile_size <= 0 or max(w, h) <= tile_size:
+            return Detections.from_results([self.predict(frame, stream_id, timeout)])
+        tiles, offsets, scales = slice_frame(frame, tile_size, tile_overlap)
+        futures = [self.submit(tile, stream_id) for tile in tiles]
+        results = [future.result(timeout) for future in futures]
+        return Detections.from_results(results, offsets, scales).merged()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "frames": self._batched_frames,
+                "mean_batch_size": self._batched_frames / self._batches if self._batches else 0.0,
+                "streams": dict(self._frames),
+            }
+
+    def _live_streams(self) -> set:
+        now = time.monotonic()
+        with self._lock:
+            return {s for s, t in self._last_seen.items() if now - t < ACTIVE_STREAM_WINDOW}
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            waiting_for = self._live_streams() - {item[0]}
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    # Only wait for streams that are live but not in this batch yet
+                    remaining = deadline - time.monotonic()
+                    if not waiting_for or remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                waiting_for.discard(item[0])
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            if self._model is None:
+                from ultralytics import YOLO
+                self._model = YOLO(self.model_path)
+            results = self._model([frame for _, frame, _ in batch], verbose=False)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._batches += 1
+            self._batched_frames += len(batch)
+            for stream_id, _, _ in batch:
+                self._frames[stream_id] = self._frames.get(stream_id, 0) + 1
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+inference_service = InferenceService()
@@ -1,10 +1,14 @@
 from sqlmodel import Session, select
 from app.core.database import engine
-from app.models.models import Survivor, MissionLog, SurvivorStatus
+from app.models.models import Survivor, SurvivorStatus
 from app.services.drone.simulated import SimulatedDrone
 from app.services.drone.base import DroneMode
+from app.services.mission.survivor_index import SurvivorIndex
+from app.services.persistence import persistence
+from app.services.planner import IncrementalTour
+from app.services.vrp import DeliveryPlan, latlon_to_metres, plan_deliveries
 from app.core.config import settings
-import math
+from app.core.settings.manager import settings_manager
 import time
 import threading
 
@@ -14,35 +18,79 @@ class MissionCoordinator:
         self.delivery = SimulatedDrone(settings.DELIVERY_DRONE_ID, settings.DEFAULT_LAT, settings.DEFAULT_LON)
         self.start_time = time.time()
         self.mission_active = False
+        # Delivery tour over undelivered survivors, updated as they are detected/served
+        self.route = IncrementalTour()
+        self._route_lock = threading.Lock()
+        self._route_loaded = False
+        self._plan = None # (key, plan) for current_plan()
+        # Every known survivor on a metre grid, so deduplicating a detection reads no rows
+        self._index = SurvivorIndex(settings.SURVIVOR_DEDUP_RADIUS)
+        self._index_lock = threading.Lock()
+        self._index_loaded = False
+        self._next_id = 1 # Survivor ids are assigned here since rows are written behind (see persistence.py)
+        persistence.add_drop_listener(self._forget_survivors)
 
     def log_event(self, message: str, level: str = "INFO", drone_id: str = None):
+        persistence.add_log(message, level, drone_id)
+
+    def _load_index(self):
+        """Seeds the survivor index from the database once; callers hold _index_lock."""
+        if self._index_loaded:
+            return
+        self._index_loaded = True
         with Session(engine) as session:
-            log = MissionLog(message=message, level=level, drone_id=drone_id)
-            session.add(log)
-            session.commit()
+            rows = session.exec(select(Survivor.id, Survivor.lat, Survivor.lon, Survivor.confidence,
+                                       Survivor.cell_x)).all()
+        if rows:
+            for (survivor_id, _, _, conf, cell_x), (x, y) in zip(rows, self._metres([(r[1], r[2]) for r in rows])):
+                self._index.add(survivor_id, x, y, conf)
+                if cell_x is None:
+                    # Rows from before the bucket columns existed
+                    cx, cy = self._index.cell(x, y)
+                    persistence.update_survivor(survivor_id, cell_x=cx, cell_y=cy)
+            self._next_id = max(r[0] for r in rows) + 1
 
     def add_survivor(self, lat: float, lon: float, conf: float, image_path: str = None):
-        with Session(engine) as session:
-            # Check duplicates
-            statement = select(Survivor)
-            results = session.exec(statement).all()
-            for s in results:
-                dist = math.hypot(s.lat - lat, s.lon - lon)
-                if dist < 0.0001:
-                    # Update image if better confidence
-                    if conf > s.confidence and image_path:
-                        s.confidence = conf
-                        s.image_path = image_path
-                        session.add(s)
-                        session.commit()
-                    return s.id
-            
-            survivor = Survivor(lat=lat, lon=lon, confidence=conf, image_path=image_path)
-            session.add(survivor)
-            session.commit()
-            session.refresh(survivor)
-            self.log_event(f"Survivor detected at {lat:.5f}, {lon:.5f}", "INFO", self.scout.telemetry.id)
-            return survivor.id
+        x, y = self._metres([(lat, lon)])[0]
+        with self._index_lock:
+            self._load_index()
+            # Check duplicates: anyone already known within SURVIVOR_DEDUP_RADIUS metres
+            known = self._index.nearest(x, y)
+            if known is not None:
+                # Update image if better confidence
+                if conf > known.confidence and image_path:
+                    self._set_image(known, conf, image_path)
+                return known.id
+
+            cx, cy = self._index.cell(x, y)
+            survivor = Survivor(id=self._next_id, lat=lat, lon=lon, confidence=conf, image_path=image_path,
+                                cell_x=cx, cell_y=cy)
+            self._next_id += 1
+            if not persistence.insert_survivor(survivor):
+                return None # Persistence is backed up; refused and counted there
+            self._index.add(survivor.id, x, y, conf)
+        self._route_update(add=[survivor])
+        self.log_event(f"Survivor detected at {lat:.5f}, {lon:.5f}", "INFO", self.scout.telemetry.id)
+        return survivor.id
+
+    def _forget_survivors(self, survivor_ids):
+        """Drops survivors whose rows could never be written, so new detections there register again."""
+        with self._index_lock:
+            for survivor_id in survivor_ids:
+                self._index.remove(survivor_id)
+        self._route_update(remove=survivor_ids)
+
+    def update_survivor_image(self, survivor_id: int, conf: float, image_path: str):
+        """Replaces a survivor's crop with a better one of the same tracked person."""
+        with self._index_lock:
+            self._load_index()
+            known = self._index.get(survivor_id)
+            if known is not None and conf > known.confidence:
+                self._set_image(known, conf, image_path)
+
+    def _set_image(self, known, conf: float, image_path: str):
+        persistence.update_survivor(known.id, confidence=conf, image_path=image_path)
+        known.confidence = conf
 
     def start_scan(self):
         self.scout.set_mode(DroneMode.SCANNING)
@@ -56,27 +104,94 @@ class MissionCoordinator:
         self.scout.telemetry.current_task = "Hovering"
         self.log_event("Mission Stopped", "INFO", self.scout.telemetry.id)
 
-    def deploy_delivery(self, path_indices):
+    def _metres(self, points):
+        return latlon_to_metres(points, (settings.DEFAULT_LAT, settings.DEFAULT_LON))
+
+    def _route_update(self, add=(), remove=()):
+        """Applies survivor changes to the live tour; the first call seeds it from the database."""
+        with self._route_lock:
+            if not self._route_loaded:
+                self._route_loaded = True
+                with Session(engine) as session:
+                    pending = session.exec(select(Survivor).where(Survivor.status != SurvivorStatus.DELIVERED)).all()
+                add = list(pending) + [s for s in add if s.id not in {p.id for p in pending}]
+            if add:
+                for survivor, point in zip(add, self._metres([(s.lat, s.lon) for s in add])):
+                    self.route.add(survivor.id, point)
+            for survivor_id in remove:
+                self.route.remove(survivor_id)
+
+    def route_order(self):
+        """Undelivered survivor ids in current tour order, and the closed tour length in metres."""
+        self._route_update()
+        with self._route_lock:
+            return self.route.order(), self.route.length
+
+    def plan_delivery(self, survivors) -> DeliveryPlan:
+        """
+        Splits survivors into trips from home base under the delivery drone's kit capacity
+        and flight range (Drone settings), cutting the live tour into trips rather than
+        re-solving it. Trip stops index into `survivors`; distances are metres.
+        """
+        drone_settings = settings_manager.get_settings().drone
+        here = (self.delivery.telemetry.lat, self.delivery.telemetry.lon)
+        metres = self._metres([here] + [(s.lat, s.lon) for s in survivors])
+        position = {s.id: i for i, s in enumerate(survivors)}
+        order, _ = self.route_order()
+        tour = [position[i] for i in order if i in position]
+        planned = set(tour)
+        tour += [i for i in range(len(survivors)) if i not in planned] # Not in the live tour (yet)
+        return plan_deliveries((0.0, 0.0), metres[1:], drone_settings.kit_capacity,
+                               max_distance=drone_settings.max_flight_distance, start=tuple(metres[0]), tour=tour)
+
+    def current_plan(self):
+        """
+        Live tour order, its length and a DeliveryPlan whose trip stops index into that order.
+        Planned from the tour's own points, and rebuilt only when the tour, the drone
+        settings or the delivery drone's position change.
+        """
+        self._route_update()
+        drone_settings = settings_manager.get_settings().drone
+        here = (self.delivery.telemetry.lat, self.delivery.telemetry.lon)
+        with self._route_lock:
+            key = (self.route.version, drone_settings.kit_capacity, drone_settings.max_flight_distance, here)
+            if self._plan is not None and self._plan[0] == key:
+                return self._plan[1]
+            order, length = self.route.order(), self.route.length
+            points = [self.route.point(survivor_id) for survivor_id in order]
+        plan = None
+        if order:
+            plan = plan_deliveries((0.0, 0.0), points, drone_settings.kit_capacity,
+                                   max_distance=drone_settings.max_flight_distance,
+                                   start=tuple(self._metres([here])[0]), tour=list(range(len(order))))
+        result = (order, length, plan)
+        self._plan = (key, result)
+        return result
+
+    def deploy_delivery(self, trips):
+        """trips: survivor ids per trip, in visiting order; the drone reloads at home between trips."""
         self.delivery.set_mode(DroneMode.DELIVERING)
         self.delivery.takeoff(10)
         self.delivery.telemetry.current_task = "Starting Delivery Run"
-        self.log_event("Delivery Drone Deployed", "INFO", self.delivery.telemetry.id)
+        self.log_event(f"Delivery Drone Deployed ({len(trips)} trips)", "INFO", self.delivery.telemetry.id)
         
         # Start background thread for delivery simulation
-        threading.Thread(target=self._run_delivery_mission, args=(path_indices,), daemon=True).start()
+        threading.Thread(target=self._run_delivery_mission, args=(trips,), daemon=True).start()
 
-    def _run_delivery_mission(self, path_indices):
+    def _run_delivery_mission(self, trips):
         with Session(engine) as session:
-            survivors = session.exec(select(Survivor)).all()
-            # Map indices to survivors (assuming 0 is home)
-            # This logic needs to match the planner's index mapping
-            
-            for idx in path_indices:
-                if idx == 0: continue # Home
-                
-                # Find survivor (simplified, assuming list order matches)
-                if idx - 1 < len(survivors):
-                    target = survivors[idx-1]
+            for trip_no, trip in enumerate(trips):
+                if trip_no > 0:
+                    # Restock kits and swap the battery at home base
+                    self.delivery.telemetry.current_task = "Returning Home to Reload"
+                    self.delivery.goto(settings.DEFAULT_LAT, settings.DEFAULT_LON, 10)
+                    time.sleep(5)
+                    self.log_event(f"Reloaded for trip {trip_no + 1}/{len(trips)}", "INFO", self.delivery.telemetry.id)
+
+                for survivor_id in trip:
+                    target = session.get(Survivor, survivor_id)
+                    if target is None or target.status == SurvivorStatus.DELIVERED:
+                        continue
                     self.delivery.telemetry.current_task = f"En route to Survivor #{target.id}"
                     self.delivery.goto(target.lat, target.lon, 10)
                     time.sleep(5) # Simulate flight time
@@ -84,9 +199,8 @@ class MissionCoordinator:
                     self.delivery.telemetry.current_task = f"Dropping Kit for #{target.id}"
                     time.sleep(2)
                     
-                    target.status = SurvivorStatus.DELIVERED
-                    session.add(target)
-                    session.commit()
+                    persistence.update_survivor(target.id, status=SurvivorStatus.DELIVERED)
+                    self._route_update(remove=[target.id])
                     self.log_event(f"Kit Delivered to Survivor #{target.id}", "SUCCESS", self.delivery.telemetry.id)
 
             self.delivery.telemetry.current_task = "Returning Home"
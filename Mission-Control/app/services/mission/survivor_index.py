@@ -0,0 +1,57 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+class IndexedSurvivor:
+    __slots__ = ("id", "x", "y", "confidence")
+
+    def __init__(self, survivor_id: int, x: float, y: float, confidence: float):
+        self.id = survivor_id
+        self.x = x
+        self.y = y
+        self.confidence = confidence
+
+
+class SurvivorIndex:
+    """
+    Known survivors bucketed on a uniform grid in metres (see vrp.latlon_to_metres).
+    With the cell size equal to the dedup radius, a lookup only reads the 3x3 cells
+    around the query point, so it costs the same however many survivors are known.
+    """
+
+    def __init__(self, radius: float):
+        self.radius = radius
+        self._cells: Dict[Tuple[int, int], List[IndexedSurvivor]] = {}
+        self._by_id: Dict[int, IndexedSurvivor] = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.radius), math.floor(y / self.radius)
+
+    def add(self, survivor_id: int, x: float, y: float, confidence: float) -> IndexedSurvivor:
+        entry = IndexedSurvivor(survivor_id, x, y, confidence)
+        self._cells.setdefault(self.cell(x, y), []).append(entry)
+        self._by_id[survivor_id] = entry
+        return entry
+
+    def remove(self, survivor_id: int):
+        entry = self._by_id.pop(survivor_id, None)
+        if entry is not None:
+            self._cells[self.cell(entry.x, entry.y)].remove(entry)
+
+    def get(self, survivor_id: int) -> Optional[IndexedSurvivor]:
+        return self._by_id.get(survivor_id)
+
+    def nearest(self, x: float, y: float) -> Optional[IndexedSurvivor]:
+        """Closest known survivor within the radius, if any."""
+        cx, cy = self.cell(x, y)
+        best, best_dist = None, self.radius
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for entry in self._cells.get((cx + dx, cy + dy), ()):
+                    dist = math.hypot(entry.x - x, entry.y - y)
+                    if dist < best_dist:
+                        best, best_dist = entry, dist
+        return best
@@ -0,0 +1,306 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import MissionLog, Survivor, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class PersistenceWorker:
+    """
+    Write-behind store for survivors and mission logs.
+
+    Callers enqueue and return immediately. A worker thread commits what is pending once
+    `batch_size` changes are waiting or `flush_interval` has passed, instead of one
+    commit (and fsync) per detection or log line: survivors in one transaction, logs in
+    another, so a bad log row can't take survivors down with it.
+
+    Survivor changes are keyed by id, so repeated updates to the same survivor collapse
+    into one write; ids are assigned by the caller. A batch that keeps failing is retried
+    row by row, and rows that still fail are queued again, up to `max_attempts` write
+    cycles each before they are dropped. Survivor changes and log rows are each refused
+    (and counted) once `max_pending` of them are waiting, and log rows are dropped when
+    their transaction keeps failing.
+
+    Listeners added with add_listener(callback) are called from the worker thread after
+    each commit with the survivors inserted or updated and the log rows written; those
+    added with add_drop_listener(callback) get the ids of new survivors given up on.
+    """
+
+    def __init__(self, flush_interval: float = settings.PERSIST_FLUSH_INTERVAL,
+                 batch_size: int = settings.PERSIST_BATCH_SIZE, max_pending: int = settings.PERSIST_MAX_PENDING,
+                 retries: int = 3, max_attempts: int = settings.PERSIST_MAX_ATTEMPTS):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retries = retries
+        self.max_attempts = max_attempts
+        self._inserts: Dict[int, Survivor] = {} # New survivors, updated in place until written
+        self._updates: Dict[int, dict] = {} # survivor id -> changed fields
+        self._logs: List[MissionLog] = []
+        self._attempts: Dict[int, int] = {} # survivor id -> failed write cycles so far
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._writing = False
+        self._flush_now = False
+        self._stopping = False
+        self._listeners: List[Callable] = []
+        self._drop_listeners: List[Callable] = []
+        self.batches = 0
+        self.written = 0
+        self.coalesced = 0
+        self.dropped_logs = 0
+        self.failed = 0 # Log rows lost to write errors
+        self.requeued = 0 # Survivor changes queued again after a failed write
+        self.dropped_survivors = 0 # Survivor changes refused under back-pressure or given up on
+
+    def insert_survivor(self, survivor: Survivor) -> bool:
+        """Queues a new survivor (it must already carry its id); False if it was refused under back-pressure."""
+        with self._cond:
+            self._ensure_worker()
+            if self._survivors_full():
+                self.dropped_survivors += 1
+                return False
+            self._inserts[survivor.id] = survivor
+            self._notify_if_full()
+            return True
+
+    def update_survivor(self, survivor_id: int, **fields) -> bool:
+        """Queues changed fields; False if refused under back-pressure (changes to a waiting survivor always fit)."""
+        fields.setdefault("updated_at", utc_now())
+        with self._cond:
+            self._ensure_worker()
+            pending = self._inserts.get(survivor_id)
+            if pending is not None:
+                for name, value in fields.items():
+                    setattr(pending, name, value)
+                self.coalesced += 1
+                return True
+            if survivor_id in self._updates:
+                self.coalesced += 1
+            elif self._survivors_full():
+                self.dropped_survivors += 1
+                return False
+            self._updates.setdefault(survivor_id, {}).update(fields)
+            self._notify_if_full()
+            return True
+
+    def add_log(self, message: str, level: str = "INFO", drone_id: Optional[str] = None) -> bool:
+        """Queues a log row (timestamped now); False if it was dropped under back-pressure."""
+        with self._cond:
+            self._ensure_worker()
+            if len(self._logs) >= self.max_pending:
+                self.dropped_logs += 1
+                return False
+            self._logs.append(MissionLog(message=message, level=level, drone_id=drone_id))
+            self._notify_if_full()
+            return True
+
+    def add_listener(self, callback: Callable[[List[Survivor], List[MissionLog]], None]):
+        self._listeners.append(callback)
+
+    def add_drop_listener(self, callback: Callable[[List[int]], None]):
+        self._drop_listeners.append(callback)
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Writes everything queued so far; True once nothing is pending."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._thread is None:
+                return not self._pending()
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._pending() or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Flushes and stops the worker; called from the app's shutdown hook."""
+        if not self.flush(timeout):
+            with self._cond:
+                logger.error("Shutting down with %d survivor changes and %d log rows not persisted",
+                             len(self._inserts) + len(self._updates), len(self._logs))
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._stopping = False
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"pending": self._pending(), "batches": self.batches, "written": self.written,
+                    "coalesced": self.coalesced, "dropped_logs": self.dropped_logs, "failed": self.failed,
+                    "requeued": self.requeued, "dropped_survivors": self.dropped_survivors}
+
+    def _pending(self) -> int:
+        return len(self._inserts) + len(self._updates) + len(self._logs)
+
+    def _survivors_full(self) -> bool:
+        return len(self._inserts) + len(self._updates) >= self.max_pending
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def _notify_if_full(self):
+        if self._pending() >= self.batch_size:
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._stopping or self._flush_now or self._pending() >= self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping and not self._pending():
+                    return
+                self._flush_now = False
+                inserts, updates, logs = self._inserts, self._updates, self._logs
+                self._inserts, self._updates, self._logs = {}, {}, []
+                self._writing = bool(inserts or updates or logs)
+            if self._writing:
+                self._write(list(inserts.values()), updates, logs)
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def _write(self, inserts: List[Survivor], updates: Dict[int, dict], logs: List[MissionLog]):
+        changed, written_logs = [], []
+        if inserts or updates:
+            changed = self._retry("survivor batch", self._commit_survivors, inserts, updates)
+            if changed is None:
+                changed = self._write_survivors_singly(inserts, updates)
+        if logs:
+            if self._retry("mission logs", self._commit_logs, logs) is not None:
+                written_logs = logs
+            else:
+                with self._cond:
+                    self.failed += len(logs)
+                logger.error("Dropped %d mission log rows that could not be written", len(logs))
+        if changed or written_logs:
+            self._notify_listeners(changed, written_logs)
+
+    def _retry(self, what: str, commit: Callable, *args):
+        """commit(*args) up to `retries` times; its result, or None if every attempt failed."""
+        for attempt in range(self.retries):
+            try:
+                return commit(*args)
+            except Exception as e:
+                logger.warning("Error persisting %s (attempt %d/%d): %s", what, attempt + 1, self.retries, e)
+                time.sleep(0.1 * (attempt + 1))
+        return None
+
+    def _commit_survivors(self, inserts: List[Survivor], updates: Dict[int, dict]) -> List[Survivor]:
+        # Rows stay readable after commit: callers keep using the survivors they queued
+        with Session(engine, expire_on_commit=False) as session:
+            session.add_all(inserts)
+            changed = list(inserts)
+            for survivor_id, fields in updates.items():
+                survivor = session.get(Survivor, survivor_id)
+                if survivor is None:
+                    continue
+                for name, value in fields.items():
+                    setattr(survivor, name, value)
+                session.add(survivor)
+                changed.append(survivor)
+            session.commit()
+        with self._cond:
+            self.batches += 1
+            self.written += len(inserts) + len(updates)
+            for survivor_id in [s.id for s in inserts] + list(updates):
+                self._attempts.pop(survivor_id, None)
+        return changed
+
+    def _commit_logs(self, logs: List[MissionLog]) -> List[MissionLog]:
+        with Session(engine, expire_on_commit=False) as session:
+            session.add_all(logs)
+            session.commit()
+        with self._cond:
+            self.batches += 1
+            self.written += len(logs)
+        return logs
+
+    def _write_survivors_singly(self, inserts: List[Survivor], updates: Dict[int, dict]) -> List[Survivor]:
+        """Isolates the rows that fail a batch; those are queued again until they run out of attempts."""
+        changed, failed_inserts, failed_updates = [], [], {}
+        for survivor in inserts:
+            try:
+                changed += self._commit_survivors([survivor], {})
+            except Exception as e:
+                failed_inserts.append(survivor)
+                logger.error("Could not write survivor #%s: %s", survivor.id, e)
+        for survivor_id, fields in updates.items():
+            try:
+                changed += self._commit_survivors([], {survivor_id: fields})
+            except Exception as e:
+                failed_updates[survivor_id] = fields
+                logger.error("Could not update survivor #%s: %s", survivor_id, e)
+        if failed_inserts or failed_updates:
+            dropped = self._requeue(failed_inserts, failed_updates)
+            if dropped:
+                self._notify_drop_listeners(dropped)
+            time.sleep(self.flush_interval) # Back off before the next attempt
+        return changed
+
+    def _requeue(self, inserts: List[Survivor], updates: Dict[int, dict]) -> List[int]:
+        """Queues failed changes again; returns the ids of new survivors that ran out of attempts."""
+        dropped = []
+        with self._cond:
+            for survivor in inserts:
+                if self._out_of_attempts(survivor.id):
+                    self._updates.pop(survivor.id, None) # Nothing left to update
+                    dropped.append(survivor.id)
+                    continue
+                # Updates queued while the insert was in flight go into the row itself
+                for name, value in self._updates.pop(survivor.id, {}).items():
+                    setattr(survivor, name, value)
+                self._inserts.setdefault(survivor.id, survivor)
+                self.requeued += 1
+            for survivor_id, fields in updates.items():
+                if self._out_of_attempts(survivor_id):
+                    continue
+                self._updates[survivor_id] = {**fields, **self._updates.get(survivor_id, {})}
+                self.requeued += 1
+        return dropped
+
+    def _out_of_attempts(self, survivor_id: int) -> bool:
+        """Counts a failed write cycle; True (and counted as dropped) once max_attempts is reached."""
+        attempts = self._attempts.get(survivor_id, 0) + 1
+        if attempts < self.max_attempts:
+            self._attempts[survivor_id] = attempts
+            return False
+        self._attempts.pop(survivor_id, None)
+        self.dropped_survivors += 1
+        logger.error("Giving up on survivor #%s after %d failed writes", survivor_id, attempts)
+        return True
+
+    def _notify_drop_listeners(self, survivor_ids: List[int]):
+        for callback in self._drop_listeners:
+            try:
+                callback(survivor_ids)
+            except Exception:
+                logger.exception("Persistence drop listener failed")
+
+    def _notify_listeners(self, survivors: List[Survivor], logs: List[MissionLog]):
+        for callback in self._listeners:
+            try:
+                callback(survivors, logs)
+            except Exception:
+                logger.exception("Persistence listener failed")
+
+
+persistence = PersistenceWorker()
@@ -1,39 +1,462 @@
 import math
-from typing import List, Tuple
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.simulation.spatial import UniformGrid
+
+NEIGHBOURS = 10 # Candidate list size for the local search
+DISTANCE_CHUNK = 512 # Rows of distances computed at once when building candidate lists
+POINTS_PER_CELL = NEIGHBOURS / 2 # Grid density for candidate lists: most k-nearest sets fit in the 3x3 block
+TIME_BUDGET = 0.5 # Default seconds of local search per solve
+MAX_REVERSAL = 50 # Longest path an IncrementalTour 2-opt move reverses
+_HOME = object() # Key of an IncrementalTour's fixed start node
 
 def calculate_distance(p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
     return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
 
+def neighbour_lists(points, k: int = NEIGHBOURS) -> np.ndarray:
+    """
+    The k nearest other points of every point, closest first, as an (n, k) index array.
+    Points are bucketed on a UniformGrid sized for ~POINTS_PER_CELL per cell, so each
+    point is only compared with the cells around it instead of all n.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(pts)
+    if n < 2:
+        return np.zeros((n, 0), dtype=np.int64)
+    extent = pts.max(axis=0) - pts.min(axis=0)
+    area = extent[0] * extent[1]
+    if area > 0:
+        cell_size = math.sqrt(area * POINTS_PER_CELL / n)
+    else:
+        cell_size = extent.max() * POINTS_PER_CELL / n or 1.0 # Collinear or coincident points
+    return UniformGrid(cell_size, pts).k_nearest(k, DISTANCE_CHUNK)
+
+def _nearest_neighbour_tour(pts: np.ndarray, start_index: int, neighbours: Sequence[Sequence[int]]) -> List[int]:
+    """
+    Nearest neighbour from start_index over the candidate lists: the next node is the
+    closest unvisited candidate, and only when all of them are visited is the nearest
+    of the remaining points searched.
+    """
+    n = len(pts)
+    visited = np.zeros(n, dtype=bool)
+    visited[start_index] = True
+    remaining = np.arange(n)
+    tour = [start_index]
+    current = start_index
+    for _ in range(n - 1):
+        nxt = next((c for c in neighbours[current] if not visited[c]), None)
+        if nxt is None:
+            remaining = remaining[~visited[remaining]]
+            d = np.hypot(pts[remaining, 0] - pts[current, 0], pts[remaining, 1] - pts[current, 1])
+            nxt = int(remaining[np.argmin(d)])
+        visited[nxt] = True
+        tour.append(nxt)
+        current = nxt
+    return tour
+
+def route_length(points: Sequence[Tuple[float, float]], order: Sequence[int], return_to_start: bool = False) -> float:
+    if len(order) < 2:
+        return 0.0
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)[list(order)]
+    if return_to_start:
+        pts = np.vstack([pts, pts[:1]])
+    seg = np.diff(pts, axis=0)
+    return float(np.hypot(seg[:, 0], seg[:, 1]).sum())
+
+class _LocalSearch:
+    """
+    2-opt and Or-opt over a path whose first node is fixed. A closed tour is handled as a
+    path that ends at a copy of the start; an open path has a free last node.
+    Moves are only tried towards each node's candidate neighbours, and a work queue
+    revisits just the nodes whose edges changed.
+    """
+
+    def __init__(self, pts: np.ndarray, tour: List[int], neighbours, closed: bool):
+        self.xs = pts[:, 0].tolist()
+        self.ys = pts[:, 1].tolist()
+        # An (n, k) array, or anything indexable by node that yields candidate lists
+        self.neighbours = neighbours.tolist() if isinstance(neighbours, np.ndarray) else neighbours
+        self.closed = closed
+        self.t = tour + [tour[0]] if closed else list(tour)
+        self.pos = [0] * len(pts)
+        self._index(0, len(self.t) - 1)
+
+    def _index(self, lo: int, hi: int):
+        t, pos = self.t, self.pos
+        for i in range(lo, hi + 1):
+            pos[t[i]] = i
+        if self.closed:
+            pos[t[0]] = 0 # The closing copy of start never moves
+
+    def d(self, a: Optional[int], b: Optional[int]) -> float:
+        if a is None or b is None:
+            return 0.0 # Open end: no edge
+        return math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    def at(self, i: int) -> Optional[int]:
+        return self.t[i] if i < len(self.t) else None
+
+    def run(self, deadline: float, seeds: Optional[Sequence[int]] = None) -> List[int]:
+        """Improves until no queued node has a move or the deadline passes. seeds: only start from these nodes."""
+        if seeds is None:
+            queue = deque(self.t[1:-1] if self.closed else self.t[1:])
+            queue.appendleft(self.t[0])
+        else:
+            queue = deque(seeds)
+        queued = set(queue)
+        while queue and time.perf_counter() < deadline:
+            a = queue.popleft()
+            queued.discard(a)
+            touched = self._improve(a)
+            for node in touched:
+                if node is not None and node not in queued:
+                    queue.append(node)
+                    queued.add(node)
+        return self.t[:-1] if self.closed else self.t
+
+    def _improve(self, a: int):
+        return self._two_opt(a) or self._or_opt(a) or ()
+
+    def _two_opt(self, a: int):
+        """Reverse t[p+1..q]: edges (t[p], t[p+1]), (t[q], t[q+1]) become (t[p], t[q]), (t[p+1], t[q+1])."""
+        t, pos, d = self.t, self.pos, self.d
+        last = len(t) - 2 if self.closed else len(t) - 1
+        i = pos[a]
+        for succ in (True, False):
+            # a's edge to its successor (p = i) or predecessor (q = i - 1 side)
+            j = i + 1 if succ else i - 1
+            if j < 0 or j > len(t) - 1:
+                continue
+            b = t[j]
+            d_ab = d(a, b)
+            for c in self.neighbours[a]:
+                d_ac = d(a, c)
+                if d_ac >= d_ab:
+                    break
+                k = pos[c]
+                if succ:
+                    # New edges (a, c) and (b, c's successor)
+                    p, q = (i, k) if k > i else (k, i)
+                else:
+                    # New edges (a, c) and (b, c's predecessor)
+                    if k == 0:
+                        continue
+                    p, q = (i - 1, k - 1) if k > i else (k - 1, i - 1)
+                if q - p < 2 or q > last or p < 0:
+                    continue
+                delta = (d(t[p], t[q]) + d(t[p + 1], self.at(q + 1))
+                         - d(t[p], t[p + 1]) - d(t[q], self.at(q + 1)))
+                if delta < -1e-12:
+                    t[p + 1:q + 1] = t[p + 1:q + 1][::-1]
+                    self._index(p + 1, q)
+                    return (t[p], t[p + 1], t[q], self.at(q + 1))
+        return None
+
+    def _or_opt(self, a: int):
+        """Moves a run of 1-3 nodes starting at `a` next to one of its candidate neighbours, possibly reversed."""
+        t, pos, d, at = self.t, self.pos, self.d, self.at
+        last = len(t) - 2 if self.closed else len(t) - 1
+        s = pos[a]
+        if s == 0:
+            return None
+        for length in (1, 2, 3):
+            e = s + length - 1
+            if e > last:
+                break
+            first, end = t[s], t[e]
+            prev, nxt = t[s - 1], at(e + 1)
+            removal_gain = d(prev, first) + d(end, nxt) - d(prev, nxt)
+            if removal_gain <= 1e-12:
+                continue
+            best = None
+            for c in self.neighbours[first] + self.neighbours[end]:
+                k0 = pos[c]
+                for k in (k0, k0 - 1): # Insert between t[k] and t[k+1]
+                    if k < 0 or s - 1 <= k <= e or k > last:
+                        continue
+                    u, v = t[k], at(k + 1)
+                    forward = d(u, first) + d(end, v) - d(u, v)
+                    backward = d(u, end) + d(first, v) - d(u, v)
+                    cost, flip = (forward, False) if forward <= backward else (backward, True)
+                    if cost < removal_gain - 1e-12 and (best is None or cost < best[0]):
+                        best = (cost, k, flip)
+            if best is None:
+                continue
+            _, k, flip = best
+            seg = t[s:e + 1]
+            if flip:
+                seg.reverse()
+            del t[s:e + 1]
+            insert_at = k + 1 if k < s else k + 1 - length
+            t[insert_at:insert_at] = seg
+            self._index(min(s, insert_at), max(e, insert_at + length - 1))
+            return (prev, nxt, first, end, t[insert_at - 1], at(insert_at + length))
+        return None
+
+def solve_tsp_route(points: Sequence[Tuple[float, float]], start_index: int = 0, return_to_start: bool = False,
+                    time_budget: float = TIME_BUDGET) -> Tuple[List[int], float]:
+    """
+    Visiting order over all points starting at `start_index`, and its total length.
+    Nearest neighbour construction on spatial candidate lists, then 2-opt / Or-opt local
+    search on the same lists until no move improves the route or `time_budget` seconds
+    of search have passed.
+    return_to_start: optimize a closed tour (the order still lists each point once).
+    """
+    if not points:
+        return [], 0.0
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    neighbours = neighbour_lists(pts).tolist()
+    tour = _nearest_neighbour_tour(pts, start_index, neighbours)
+    # Construction is near-linear; the budget is spent on improving the tour
+    deadline = time.perf_counter() + time_budget
+    if len(tour) > 3:
+        tour = _LocalSearch(pts, tour, neighbours, return_to_start).run(deadline)
+    return tour, route_length(pts, tour, return_to_start)
+
 def solve_tsp(points: List[Tuple[float, float]], start_index: int = 0) -> List[int]:
     """
-    Nearest Neighbor Heuristic for TSP.
+    Open-path TSP from start_index (see solve_tsp_route).
     points: List of (lat, lon) tuples
     Returns: List of indices representing the path
     """
-    if not points:
-        return []
-        
-    n = len(points)
-    visited = [False] * n
-    path = [start_index]
-    visited[start_index] = True
-    
-    current_index = start_index
-    
-    for _ in range(n - 1):
-        nearest_dist = float('inf')
-        nearest_index = -1
-        
-        for i in range(n):
-            if not visited[i]:
-                dist = calculate_distance(points[current_index], points[i])
-                if dist < nearest_dist:
-                    nearest_dist = dist
-                    nearest_index = i
-        
-        if nearest_index != -1:
-            visited[nearest_index] = True
-            path.append(nearest_index)
-            current_index = nearest_index
-            
-    return path
+    return solve_tsp_route(points, start_index)[0]
+
+
+class IncrementalTour:
+    """
+    Closed tour from a fixed home that is kept up to date point by point, so a live
+    route never has to be re-solved from scratch.
+
+    The tour is a doubly linked list with a spatial hash over its nodes. A new point
+    goes in by cheapest insertion, tried only on the edges around its nearest tour
+    nodes. Every `improve_every` changes, 2-opt/Or-opt runs on the linked list itself,
+    seeded with just the changed nodes, and `length` is kept from the move deltas, so
+    an update costs the same however long the tour is.
+    Keys are any hashable ids; positions are planar (e.g. metres).
+    """
+
+    def __init__(self, home: Tuple[float, float] = (0.0, 0.0), cell_size: float = 50.0,
+                 neighbours: int = NEIGHBOURS, improve_every: int = 8, time_budget: float = 0.02):
+        self.cell_size = cell_size
+        self.k = neighbours
+        self.improve_every = improve_every
+        self.time_budget = time_budget
+        self.length = 0.0
+        self.version = 0 # Bumped whenever the order changes, for callers caching anything derived from it
+        self._pt = {}
+        self._succ = {}
+        self._pred = {}
+        self._cells = {}
+        self._dirty = set()
+        self._changes = 0
+        self._add_node(_HOME, home)
+        self._succ[_HOME] = self._pred[_HOME] = _HOME
+
+    def __len__(self) -> int:
+        return len(self._pt) - 1
+
+    def __contains__(self, key) -> bool:
+        return key in self._pt and key is not _HOME
+
+    def order(self) -> list:
+        """Keys in visiting order, starting after home."""
+        keys = []
+        key = self._succ[_HOME]
+        while key is not _HOME:
+            keys.append(key)
+            key = self._succ[key]
+        return keys
+
+    def point(self, key) -> Tuple[float, float]:
+        return self._pt[key]
+
+    def add(self, key, point: Tuple[float, float]) -> float:
+        """Inserts a point where it lengthens the tour least; returns that added length."""
+        if key in self:
+            self.remove(key)
+        x, y = float(point[0]), float(point[1])
+        best = None
+        for u in self._nearest(x, y, self.k):
+            for a, b in ((u, self._succ[u]), (self._pred[u], u)):
+                cost = self._d(a, (x, y)) + self._d(b, (x, y)) - self._dist(a, b)
+                if best is None or cost < best[0]:
+                    best = (cost, a, b)
+        cost, a, b = best
+        self._add_node(key, (x, y))
+        self._succ[a], self._pred[key], self._succ[key], self._pred[b] = key, a, b, key
+        self.length += cost
+        self.version += 1
+        self._changed(key)
+        return cost
+
+    def remove(self, key):
+        if key not in self:
+            return
+        a, b = self._pred.pop(key), self._succ.pop(key)
+        self.length += self._dist(a, b) - self._dist(a, key) - self._dist(key, b)
+        self._succ[a], self._pred[b] = b, a
+        x, y = self._pt.pop(key)
+        cell = self._cells[self._cell(x, y)]
+        cell.discard(key)
+        self._dirty.discard(key)
+        self.version += 1
+        self._changed(a, b)
+
+    def improve(self, time_budget: Optional[float] = None):
+        """Local search around the nodes changed since the last improvement."""
+        dirty, self._dirty, self._changes = self._dirty, set(), 0
+        if len(self._pt) < 4 or not dirty:
+            return
+        deadline = time.perf_counter() + (self.time_budget if time_budget is None else time_budget)
+        candidates = {}
+        queue = deque(dirty)
+        queued = set(dirty)
+        while queue and time.perf_counter() < deadline:
+            a = queue.popleft()
+            queued.discard(a)
+            if a not in self._pt:
+                continue
+            if a not in candidates:
+                x, y = self._pt[a]
+                candidates[a] = self._nearest(x, y, self.k, exclude=a)
+            touched = self._two_opt(a, candidates[a]) or self._or_opt(a, candidates) or ()
+            if touched:
+                self.version += 1
+            for key in touched:
+                if key not in queued:
+                    queue.append(key)
+                    queued.add(key)
+
+    def _two_opt(self, a, candidates: list):
+        """Replaces a's edge to its successor or predecessor and one edge at a candidate by two shorter ones."""
+        for succ in (True, False):
+            b = self._succ[a] if succ else self._pred[a]
+            d_ab = self._dist(a, b)
+            for c in candidates:
+                d_ac = self._dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                e = self._succ[c] if succ else self._pred[c]
+                if c == b or e == a:
+                    continue
+                delta = d_ac + self._dist(b, e) - d_ab - self._dist(c, e)
+                if delta >= -1e-12:
+                    continue
+                # Both cases as edges (p, succ p), (q, succ q) -> (p, q), (succ p, succ q)
+                p, q = (a, c) if succ else (e, b)
+                if self._reconnect(p, q):
+                    self.length += delta
+                    return (a, b, c, e)
+        return None
+
+    def _reconnect(self, p, q) -> bool:
+        """
+        2-opt by reversing whichever of the paths succ(p)..q and succ(q)..p is shorter; gives
+        up if both are longer than MAX_REVERSAL, so a move costs O(MAX_REVERSAL) at most.
+        """
+        first, second = self._succ[p], self._succ[q]
+        x, y = first, second
+        for _ in range(MAX_REVERSAL):
+            if x == q:
+                self._reverse(first, q)
+                return True
+            if y == p:
+                self._reverse(second, p)
+                return True
+            x, y = self._succ[x], self._succ[y]
+        return False
+
+    def _reverse(self, x, y):
+        """Reverses the path x..y (following successors) in place."""
+        before, after = self._pred[x], self._succ[y]
+        key = x
+        while True:
+            nxt = self._succ[key]
+            self._succ[key], self._pred[key] = self._pred[key], nxt
+            if key == y:
+                break
+            key = nxt
+        self._succ[before], self._pred[y] = y, before
+        self._succ[x], self._pred[after] = after, x
+
+    def _or_opt(self, a, candidates: dict):
+        """Moves the run of 1-3 nodes starting at `a` between two nodes near either end, possibly reversed."""
+        segment = [a]
+        for _ in range(3):
+            if len(segment) + 3 > len(self._pt):
+                break
+            first, end = segment[0], segment[-1]
+            prev, nxt = self._pred[first], self._succ[end]
+            removal_gain = self._dist(prev, first) + self._dist(end, nxt) - self._dist(prev, nxt)
+            if removal_gain > 1e-12:
+                if end not in candidates:
+                    candidates[end] = self._nearest(*self._pt[end], self.k, exclude=end)
+                best = None
+                for c in candidates[first] + candidates[end]:
+                    for u, v in ((c, self._succ[c]), (self._pred[c], c)):
+                        if u in segment or v in segment:
+                            continue
+                        forward = self._dist(u, first) + self._dist(end, v) - self._dist(u, v)
+                        backward = self._dist(u, end) + self._dist(first, v) - self._dist(u, v)
+                        cost, flip = (forward, False) if forward <= backward else (backward, True)
+                        if cost < removal_gain - 1e-12 and (best is None or cost < best[0]):
+                            best = (cost, u, v, flip)
+                if best is not None:
+                    cost, u, v, flip = best
+                    self._succ[prev], self._pred[nxt] = nxt, prev
+                    if flip:
+                        for key in segment:
+                            self._succ[key], self._pred[key] = self._pred[key], self._succ[key]
+                        first, end = end, first
+                    self._succ[u], self._pred[first] = first, u
+                    self._succ[end], self._pred[v] = v, end
+                    self.length += cost - removal_gain
+                    return (prev, nxt, first, end, u, v)
+            segment.append(self._succ[segment[-1]])
+        return None
+
+    def _changed(self, *keys):
+        self._dirty.update(keys)
+        self._changes += 1
+        if self._changes >= self.improve_every:
+            self.improve()
+
+    def _d(self, key, point) -> float:
+        x, y = self._pt[key]
+        return math.hypot(x - point[0], y - point[1])
+
+    def _dist(self, a, b) -> float:
+        return self._d(a, self._pt[b])
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def _add_node(self, key, point):
+        self._pt[key] = point
+        self._cells.setdefault(self._cell(*point), set()).add(key)
+
+    def _nearest(self, x: float, y: float, k: int, exclude=None) -> list:
+        """Up to k tour nodes (home included) closest to (x, y), nearest first."""
+        n = len(self._pt) - (exclude is not None)
+        k = min(k, n)
+        if n <= 4 * k:
+            found = [(self._d(key, (x, y)), key) for key in self._pt if key is not exclude]
+        else:
+            # Grow square rings of cells until the k-th best is closer than anything further out
+            cx, cy = self._cell(x, y)
+            found = []
+            r = 0
+            while len(found) < n:
+                for dx in range(-r, r + 1):
+                    for dy in ((-r, r) if abs(dx) != r else range(-r, r + 1)) if r else (0,):
+                        for key in self._cells.get((cx + dx, cy + dy), ()):
+                            if key is not exclude:
+                                found.append((self._d(key, (x, y)), key))
+                if len(found) >= k and sorted(d for d, _ in found)[k - 1] <= r * self.cell_size:
+                    break
+                r += 1
+        found.sort(key=lambda item: item[0])
+        return [key for _, key in found[:k]]
+
@@ -0,0 +1,121 @@
+"""
+Adaptive inference rate for the camera streams.
+
+Each stream runs inference at most `target_fps` times a second, skips frames that
+barely differ from the last one it ran the model on (the scout hovering over an
+area it has already scanned), and slows down while this process is using more than
+its share of the CPU so the API stays responsive on field laptops.
+"""
+import os
+import threading
+import time
+from typing import Optional
+import cv2
+import numpy as np
+from app.core.config import settings
+
+THUMB_SIZE = (96, 54) # Downsampled grey frame used for change detection
+PIXEL_DELTA = 12 # Grey-level difference that counts a thumbnail pixel as changed (above sensor noise)
+CPU_SAMPLE_INTERVAL = 0.5 # Seconds between CPU load samples
+MIN_FPS = 0.5 # Backoff never drops below this
+
+
+class CpuMonitor:
+    """This process's CPU use as a fraction of all cores, sampled at most every CPU_SAMPLE_INTERVAL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+        self._load = 0.0
+        self._cores = os.cpu_count() or 1
+
+    def load(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._wall >= CPU_SAMPLE_INTERVAL:
+                cpu = time.process_time()
+                self._load = (cpu - self._cpu) / ((now - self._wall) * self._cores)
+                self._wall, self._cpu = now, cpu
+            return self._load
+
+
+cpu_monitor = CpuMonitor()
+
+
+class RateController:
+    """
+    Decides which frames of one stream go to the model.
+
+    The rate limit starts at target_fps, is cut by `backoff` whenever the process is over
+    its cpu_budget and recovers by `recovery` per inference once it is back under.
+    """
+
+    def __init__(self, target_fps: float = 10, cpu_budget: float = 0.5,
+                 change_threshold: float = settings.FRAME_CHANGE_THRESHOLD,
+                 max_skip_interval: float = settings.FRAME_MAX_SKIP_INTERVAL,
+                 backoff: float = 0.8, recovery: float = 1.05):
+        self.target_fps = max(MIN_FPS, target_fps) # The rate limit divides by it
+        self.cpu_budget = cpu_budget
+        self.change_threshold = change_threshold
+        self.max_skip_interval = max_skip_interval
+        self.backoff = backoff
+        self.recovery = recovery
+        self.fps_limit = self.target_fps
+        self._last_inference = 0.0
+        self._last_thumb: Optional[np.ndarray] = None
+        self._effective_fps = 0.0
+        self._lock = threading.Lock()
+        self.frames = 0 # New frames considered
+        self.inferred = 0
+        self.skipped_unchanged = 0
+
+    def configure(self, target_fps: float, cpu_budget: float):
+        target_fps = max(MIN_FPS, target_fps)
+        if target_fps != self.target_fps:
+            self.fps_limit = target_fps
+        self.target_fps, self.cpu_budget = target_fps, cpu_budget
+
+    def wait_time(self) -> float:
+        """Seconds until the rate limit allows the next inference."""
+        return max(0.0, self._last_inference + 1.0 / self.fps_limit - time.monotonic())
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """Called once per new frame when wait_time() is 0; records the decision."""
+        now = time.monotonic()
+        small = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        with self._lock:
+            self.frames += 1
+            if (self._last_thumb is not None and now - self._last_inference < self.max_skip_interval
+                    and (cv2.absdiff(thumb, self._last_thumb) > PIXEL_DELTA).mean() < self.change_threshold):
+                self.skipped_unchanged += 1
+                return False
+
+            self.inferred += 1
+            if self._last_inference:
+                # Exponential moving average of the achieved rate
+                rate = 1.0 / max(now - self._last_inference, 1e-3)
+                self._effective_fps = 0.8 * self._effective_fps + 0.2 * rate if self._effective_fps else rate
+            self._last_inference = now
+            self._last_thumb = thumb
+
+            if cpu_monitor.load() > self.cpu_budget:
+                self.fps_limit = max(MIN_FPS, self.fps_limit * self.backoff)
+            else:
+                self.fps_limit = min(self.target_fps, self.fps_limit * self.recovery)
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = time.monotonic() - self._last_inference > max(2.0, 2.0 / self.fps_limit)
+            return {
+                "target_fps": self.target_fps,
+                "fps_limit": round(self.fps_limit, 2),
+                "effective_fps": 0.0 if idle else round(self._effective_fps, 2),
+                "frames": self.frames,
+                "inferred": self.inferred,
+                "skipped_unchanged": self.skipped_unchanged,
+                "skip_ratio": round(self.skipped_unchanged / self.frames, 3) if self.frames else 0.0,
+                "cpu_load": round(cpu_monitor.load(), 3),
+            }
@@ -0,0 +1,184 @@
+"""
+Batch simulation over many images and parameter sets.
+
+Runs in two phases on a process pool: YOLO detection once per image, then one
+simulation per (image, parameter set) scenario. Simulation workers never load
+the model, and video rendering is off unless requested.
+
+CLI:
+    python -m app.services.simulation.batch data/floods/ --mode both \\
+        --delivery-speed 15 20 --capacity 10 20 --workers 8 --output sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Sequence
+from pydantic import ValidationError
+from app.services.simulation.occupancy import OBSTACLE_MODES
+from app.services.simulation.params import SimulationParams
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+def expand_grid(sweep: Dict[str, Sequence], base: Optional[SimulationParams] = None) -> List[SimulationParams]:
+    """Cartesian product of the swept fields on top of `base`."""
+    base = base or SimulationParams()
+    fields = [name for name, values in sweep.items() if values]
+    combos = itertools.product(*(sweep[name] for name in fields))
+    return [base.model_copy(update=dict(zip(fields, combo))) for combo in combos]
+
+
+def collect_images(paths: Iterable[str]) -> List[str]:
+    """Expands directories into the images they contain; files are kept as given."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(os.path.join(path, name))
+        else:
+            images.append(path)
+    return images
+
+
+def _detect_image(image_path: str, tile_size: int = 0, tile_overlap: float = 0.2):
+    import cv2
+    from app.services.simulation.engine import simulation_engine
+    try:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("Could not load image")
+        h, w = image.shape[:2]
+        return image_path, (w, h), simulation_engine.detect_survivors(image, tile_size, tile_overlap), None
+    except Exception as e:
+        traceback.print_exc()
+        return image_path, None, None, f"{type(e).__name__}: {e}"
+
+
+def _run_scenario(task) -> dict:
+    from app.services.simulation.engine import simulation_engine
+    image_path, size, survivors, params, video_options = task
+    row = {"image": image_path, **params.model_dump()}
+    try:
+        if video_options is None and params.obstacle_mode == "none":
+            summary = simulation_engine.simulate_mission(survivors, size, params)
+        elif video_options is None:
+            # Obstacles come from the imagery, so the image has to be loaded after all
+            summary = simulation_engine.run_simulation(image_path, params=params, survivors=survivors,
+                                                       headless=True)["metrics"]
+        else:
+            result = simulation_engine.run_simulation(image_path, params=params, survivors=survivors, **video_options)
+            summary = result["metrics"]
+            row["video_url"] = result["video_url"]
+        # Keep the table flat; per-survivor/per-drone detail stays in the engine report
+        row.update({k: v for k, v in summary.items() if k not in ("survivor_log", "drones")})
+    except Exception as e:
+        traceback.print_exc()
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def run_batch(image_paths: Sequence[str], param_sets: Sequence[SimulationParams], workers: Optional[int] = None,
+              render_video: bool = False, output_width: Optional[int] = None, frame_stride: int = 1) -> List[dict]:
+    """
+    Simulates every image against every parameter set and returns one result row per scenario.
+    Detection runs once per image with the first parameter set's tiling options.
+    """
+    workers = workers or os.cpu_count() or 1
+    video_options = dict(output_width=output_width, frame_stride=frame_stride) if render_video else None
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    tiling = dict(tile_size=param_sets[0].tile_size, tile_overlap=param_sets[0].tile_overlap) if param_sets else {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        tasks = []
+        for image_path, size, survivors, error in pool.map(partial(_detect_image, **tiling), image_paths):
+            if error is not None:
+                rows.append({"image": image_path, "error": error})
+                continue
+            for params in param_sets:
+                tasks.append((image_path, size, survivors, params, video_options))
+        chunksize = max(1, len(tasks) // (workers * 4))
+        rows.extend(pool.map(_run_scenario, tasks, chunksize=chunksize))
+    return rows
+
+
+def write_results(rows: List[dict], path: str):
+    columns = []
+    for row in rows:
+        columns.extend(k for k in row if k not in columns)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: json.dumps(v) if isinstance(v, list) else v for k, v in row.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the delivery simulator over images x parameter grids.")
+    parser.add_argument("images", nargs="+", help="Image files or directories of images")
+    parser.add_argument("--mode", choices=["single", "multi", "both"], default="both", help="Delivery fleet mode(s)")
+    parser.add_argument("--scout-speed", type=float, nargs="+")
+    parser.add_argument("--delivery-speed", type=float, nargs="+")
+    parser.add_argument("--capacity", type=int, nargs="+", help="Kits per trip in single drone mode")
+    parser.add_argument("--range", type=float, nargs="+", help="Flight distance per trip in single drone mode")
+    parser.add_argument("--detection-radius", type=float, nargs="+")
+    parser.add_argument("--delivery-radius", type=float, nargs="+")
+    parser.add_argument("--obstacle-mode", choices=OBSTACLE_MODES, nargs="+", help="Obstacles from imagery")
+    parser.add_argument("--grid-scale", type=int, nargs="+", help="Pixels per routing grid cell")
+    parser.add_argument("--max-steps", type=int, default=SimulationParams().max_steps)
+    parser.add_argument("--tile-size", type=int, default=0, help="Sliced inference tile size for large images (0 = off)")
+    parser.add_argument("--tile-overlap", type=float, default=SimulationParams().tile_overlap)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--render", action="store_true", help="Also encode a video per scenario")
+    parser.add_argument("--output-width", type=int, default=None, help="Video width when rendering")
+    parser.add_argument("--frame-stride", type=int, default=1, help="Encode every Nth tick when rendering")
+    parser.add_argument("--output", default="simulation_results.csv", help="CSV file for the results table")
+    args = parser.parse_args(argv)
+
+    modes = {"single": [True], "multi": [False], "both": [False, True]}[args.mode]
+    try:
+        base = SimulationParams(max_steps=args.max_steps, tile_size=args.tile_size, tile_overlap=args.tile_overlap)
+    except ValidationError as e:
+        parser.error(f"invalid options (--tile-size must be >= 0, --tile-overlap in [0, 1)): {e}")
+    param_sets = expand_grid({
+        "single_drone_mode": modes,
+        "scout_speed": args.scout_speed,
+        "delivery_speed": args.delivery_speed,
+        "single_drone_capacity": args.capacity,
+        "single_drone_range": args.range,
+        "detection_radius": args.detection_radius,
+        "delivery_radius": args.delivery_radius,
+        "obstacle_mode": args.obstacle_mode,
+        "grid_scale": args.grid_scale,
+    }, base=base)
+
+    images = collect_images(args.images)
+    if not images:
+        parser.error("no images found")
+    print(f"Running {len(images)} image(s) x {len(param_sets)} parameter set(s)")
+
+    rows = run_batch(images, param_sets, workers=args.workers, render_video=args.render,
+                     output_width=args.output_width, frame_stride=args.frame_stride)
+    write_results(rows, args.output)
+
+    for row in rows:
+        if "error" in row:
+            print(f"{row['image']}: ERROR {row['error']}")
+            continue
+        mode = "single" if row["single_drone_mode"] else "multi"
+        latency = row["mean_delivery_latency"]
+        print(f"{os.path.basename(row['image'])} [{mode}] steps={row['steps']} "
+              f"delivered={row['delivered']}/{row['delivery_sites']} "
+              f"mean_latency={'-' if latency is None else f'{latency:.1f}'} "
+              f"distance={row['delivery_distance']:.0f}px")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
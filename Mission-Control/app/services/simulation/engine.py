@@ -1,23 +1,93 @@
 import cv2
+import math
 import numpy as np
 import os
+import shutil
 import uuid
 import time
-from ultralytics import YOLO
-from app.services.simulation.pathfinding import astar_search
-from app.core.config import settings
+from typing import Callable, Optional
+from app.services.inference import inference_service
+from app.services.simulation.metrics import MissionMetrics
+from app.services.simulation.occupancy import build_occupancy_grid, load_no_fly_mask
+from app.services.simulation.params import SimulationParams
+from app.services.simulation.spatial import UniformGrid
+from app.services.simulation.state import SurvivorState, DroneFleet, IDLE, MOVING, RETURNING, COMPLETED
+from app.services.simulation.renderer import FrameRenderer
+from app.services.simulation.routing import Router
+from app.services.simulation.video import VideoSink
+from app.services.vrp import plan_deliveries
+
+class SimulationCancelled(Exception):
+    """Raised from a progress callback to abort a running simulation."""
+
 
 class SimulationEngine:
     def __init__(self, upload_dir="app/static/simulations"):
         self.upload_dir = upload_dir
-        self.model = YOLO(settings.MODEL_PATH) # Reuse the main model
         os.makedirs(upload_dir, exist_ok=True)
 
-    def run_simulation(self, image_path: str, single_drone_mode: bool = False) -> dict:
-        job_id = str(uuid.uuid4())
+    def detect_survivors(self, image, tile_size: int = 0, tile_overlap: float = 0.2) -> SurvivorState:
+        """Runs YOLO over the image (sliced into tiles if tile_size > 0) and returns every detected person as a survivor."""
+        # The shared service loads the weights on first use, so processes that only
+        # simulate (batch sweeps) never load them
+        detections = inference_service.detect(image, stream_id="simulation", tile_size=tile_size,
+                                              tile_overlap=tile_overlap)
+        positions, boxes = [], []
+        for (x1, y1, x2, y2), cls in zip(detections.xyxy.astype(int).tolist(), detections.cls):
+            if cls == 0: # Person
+                positions.append(((x1 + x2) // 2, (y1 + y2) // 2))
+                boxes.append((x1, y1, x2, y2))
+        return SurvivorState(positions, boxes)
+
+    def run_simulation(self, image_path: str, single_drone_mode: Optional[bool] = None, output_width: Optional[int] = None,
+                       frame_stride: int = 1, max_video_seconds: Optional[float] = None, fps: int = 30,
+                       job_id: Optional[str] = None, progress_callback: Optional[Callable] = None,
+                       params: Optional[SimulationParams] = None, headless: bool = False,
+                       survivors: Optional[SurvivorState] = None, no_fly_mask: Optional[str] = None) -> dict:
+        """
+        Runs a full mission over a still image and encodes it as an MP4.
+        output_width: render the video at this width (aspect kept, never upscaled).
+        frame_stride: encode only every Nth simulation tick.
+        max_video_seconds: cap the video length; the stride is raised to fit the mission.
+        The mission itself always steps at full fidelity regardless of these options.
+        progress_callback(step, survivors_total, detected, delivered) is called every tick;
+        it may raise SimulationCancelled to abort the run.
+        params: mission parameters (single_drone_mode, when given, overrides params.single_drone_mode).
+        headless: skip all drawing and encoding; the result only carries the metrics report.
+        survivors: precomputed detections, skipping YOLO.
+        no_fly_mask: path to a mask image whose non-black pixels drones must not cross.
+        """
+        params = params or SimulationParams()
+        if single_drone_mode is not None:
+            params = params.model_copy(update={"single_drone_mode": single_drone_mode})
+
+        job_id = job_id or str(uuid.uuid4())
         job_dir = os.path.join(self.upload_dir, job_id)
-        os.makedirs(job_dir, exist_ok=True)
+        if not headless:
+            os.makedirs(job_dir, exist_ok=True)
+        try:
+            return self._run(image_path, job_id, job_dir, params, output_width, frame_stride,
+                             max_video_seconds, fps, progress_callback, headless, survivors, no_fly_mask)
+        except BaseException:
+            # Don't leave half-written videos behind for failed or cancelled runs
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+    def simulate_mission(self, survivors: SurvivorState, size, params: Optional[SimulationParams] = None,
+                         progress_callback: Optional[Callable] = None, grid: Optional[np.ndarray] = None) -> dict:
+        """
+        Headless run from precomputed detections: no image, no drawing, no encoding.
+        grid: routing grid (see build_occupancy_grid); all cells free when omitted.
+        Returns the metrics report (see MissionMetrics.report).
+        """
+        params = params or SimulationParams()
+        metrics = MissionMetrics(len(survivors))
+        for _ in self._simulate(size, survivors, params, metrics, progress_callback=progress_callback, grid=grid):
+            pass
+        return metrics.summary
 
+    def _run(self, image_path, job_id, job_dir, params, output_width, frame_stride,
+             max_video_seconds, fps, progress_callback, headless, survivors, no_fly_mask):
         # 1. Load Image
         original_img = cv2.imread(image_path)
         if original_img is None:
@@ -26,329 +96,304 @@ class SimulationEngine:
         h, w = original_img.shape[:2]
         
         # 2. Detect Humans (Ground Truth)
-        results = self.model(original_img)
-        survivors = []
-        for box in results[0].boxes:
-            if int(box.cls[0]) == 0: # Person
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                survivors.append({
-                    "pos": (cx, cy),
-                    "box": (x1, y1, x2, y2),
-                    "detected": False,
-                    "delivery_dispatched": False,
-                    "delivered": False
-                })
+        if survivors is None:
+            survivors = self.detect_survivors(original_img, params.tile_size, params.tile_overlap)
         
         survivor_count = len(survivors)
+        metrics = MissionMetrics(survivor_count)
+        grid = self.routing_grid(original_img, survivors, params, no_fly_mask)
+
+        if headless:
+            for _ in self._simulate((w, h), survivors, params, metrics, progress_callback=progress_callback, grid=grid):
+                pass
+            return {
+                "job_id": job_id,
+                "survivors_count": survivor_count,
+                "metrics": metrics.summary
+            }
+
+        # 3. Simulate, streaming each frame to the encoder as it is rendered
+        video_filename = "simulation.mp4"
+        video_path = os.path.join(job_dir, video_filename)
+        
+        out_size = self._output_size(w, h, output_width)
+        max_frames = max(1, int(max_video_seconds * fps)) if max_video_seconds else None
+        renderer = FrameRenderer(original_img, survivors, size=out_size)
+        
+        with VideoSink(video_path, fps, out_size) as sink:
+            frames = self._simulate((w, h), survivors, params, metrics, renderer=renderer,
+                                    frame_stride=frame_stride, max_frames=max_frames,
+                                    progress_callback=progress_callback, grid=grid)
+            for frame in frames:
+                sink.write_copy(frame)
+
+        if sink.frames_written == 0:
+            print("Error: No frames generated during simulation.")
+            raise ValueError("Simulation failed to generate any frames.")
 
-        # 3. Setup Drones
+        print(f"Video generated at {video_path} with {sink.frames_written} frames.")
+
+        return {
+            "job_id": job_id,
+            "survivors_count": survivor_count,
+            "video_url": f"/static/simulations/{job_id}/{video_filename}",
+            "frames": sink.frames_written,
+            "resolution": list(out_size),
+            "metrics": metrics.summary
+        }
+
+    def _simulate(self, size, survivors: SurvivorState, params: SimulationParams, metrics: MissionMetrics,
+                  renderer: Optional[FrameRenderer] = None, frame_stride: int = 1, max_frames: Optional[int] = None,
+                  progress_callback: Optional[Callable] = None, grid: Optional[np.ndarray] = None):
+        """
+        Runs the mission tick by tick. With a renderer, yields a frame every `frame_stride` ticks
+        (at most `max_frames`, always including the final tick); without one nothing is drawn.
+        Frames are the renderer's persistent canvas: copy a frame to keep it past the next step.
+        grid: routing grid at params.grid_scale (0 = free, 1 = obstacle); all free when omitted.
+        The final metrics report is stored on `metrics.summary`.
+        """
+        w, h = size
+        survivor_count = len(survivors)
+        single_drone_mode = params.single_drone_mode
+        home = np.array([0, h // 2], dtype=np.float64)
+
+        # 1. Setup Drones
         # Scout Drone
-        scout_pos = [0, h // 2]
-        scout_path = self._generate_lawn_mower_path(w, h, step=100)
-        scout_speed = 10 # pixels per frame
+        scout_path = self._generate_lawn_mower_path(w, h, step=params.sweep_spacing)
+        scout_speed = params.scout_speed # pixels per frame
+        scout = DroneFleet(scout_speed, capacity=1)
+        scout.add(home, status=MOVING, path=scout_path)
+
+        if max_frames:
+            # The scout sweep is a lower bound on mission length; spread the frame budget over it
+            sweep = np.diff(np.asarray(scout_path, dtype=np.float64), axis=0)
+            estimated_steps = np.hypot(sweep[:, 0], sweep[:, 1]).sum() / scout_speed
+            frame_stride = max(frame_stride, math.ceil(estimated_steps / max_frames))
         
         # Delivery Drones
-        delivery_drones = [] 
-        delivery_speed = 15
+        delivery_drones = DroneFleet(params.delivery_speed)
         
         # Single Drone Mode State
         single_drone_queue = [] # List of survivor indices
-        single_drone_capacity = 20
+        single_drone_trip = [] # Survivors left on the current trip, in planned order
+        single_drone_capacity = params.single_drone_capacity
         single_drone_kits = single_drone_capacity # Current kits on board
-        active_delivery_sites = [] # List of (x, y) where kits have been delivered/dispatched
-        delivery_radius_pixels = 50 # Approx 10m in pixels (tunable)
+        single_drone_range = params.single_drone_range # Flight distance per trip (battery)
+        single_drone_reloading = False # Heading home to restock and recharge
+        trip_start_distance = 0.0 # Distance flown when the current trip left home
+        delivery_radius_pixels = params.delivery_radius
         
         if single_drone_mode:
             # Initialize one drone at home
-            delivery_drones.append({
-                "pos": [0, h // 2],
-                "path": [],
-                "path_idx": 0,
-                "target": None,
-                "status": "idle", # idle, moving, returning, completed
-                "survivor_idx": -1
-            })
-
-        # 4. Simulation Loop
-        frames = []
-        scout_target_idx = 0
+            delivery_drones.add(home, status=IDLE)
+
+        # 2. Simulation Loop
         
-        # Create a grid for A* (0 = free, 1 = obstacle)
-        grid_scale = 10
-        grid_w, grid_h = w // grid_scale, h // grid_scale
-        grid = np.zeros((grid_h, grid_w), dtype=int)
+        # Routing grid (0 = free, 1 = obstacle)
+        grid_scale = params.grid_scale
+        if grid is None:
+            grid = np.zeros((h // grid_scale, w // grid_scale), dtype=np.int8)
+        # Every trip starts or ends at home: one distance field from there answers all of them
+        home_cell = self._grid_cell(home, grid_scale)
+        router = Router(grid, sources=[home_cell])
+
+        max_steps = params.max_steps
+        detection_radius = params.detection_radius
 
-        max_steps = 5000 # Increased for single drone mode reloading
+        # Spatial indexes: survivors are static and bucketed once by sensor footprint,
+        # delivery sites are inserted as they are dispatched.
+        survivor_index = UniformGrid(detection_radius, survivors.pos)
+        active_delivery_sites = UniformGrid(delivery_radius_pixels) # Where kits have been delivered/dispatched
         step = 0
+        rendered = 0
+        done = False
         
         while step < max_steps:
-            frame = original_img.copy()
             
             # --- Scout Logic ---
-            if scout_target_idx < len(scout_path):
-                target = scout_path[scout_target_idx]
-                dist = np.linalg.norm(np.array(target) - np.array(scout_pos))
-                
-                if dist < scout_speed:
-                    scout_pos = list(target)
-                    scout_target_idx += 1
-                else:
-                    direction = (np.array(target) - np.array(scout_pos)) / dist
-                    scout_pos[0] += direction[0] * scout_speed
-                    scout_pos[1] += direction[1] * scout_speed
+            for i in scout.step():
+                scout.status[i] = COMPLETED
+            scout_pos = scout.pos[0]
+            scout_finished = scout.finished_path(0)
             
             # Check detections
-            detection_radius = 100
-            for idx, s in enumerate(survivors):
-                s_dist = np.linalg.norm(np.array(s["pos"]) - np.array(scout_pos))
-                if s_dist < detection_radius and not s["detected"]:
-                    s["detected"] = True
-                    
-                    # Check delivery radius constraint
-                    too_close = False
-                    for site in active_delivery_sites:
-                        if np.linalg.norm(np.array(s["pos"]) - np.array(site)) < delivery_radius_pixels:
-                            too_close = True
-                            break
-                    
-                    if not too_close:
-                        active_delivery_sites.append(s["pos"])
-                        
-                        if single_drone_mode:
-                            # Add to queue
-                            single_drone_queue.append(idx)
-                        else:
-                            # Dispatch Delivery Drone (Multiple Mode)
-                            start_node = (0, h // 2) # Home
-                            end_node = s["pos"]
-                            
-                            # Convert to grid coords for A*
-                            start_grid = (start_node[0] // grid_scale, start_node[1] // grid_scale)
-                            end_grid = (end_node[0] // grid_scale, end_node[1] // grid_scale)
-                            
-                            path_grid = astar_search(grid, start_grid, end_grid)
-                            
-                            if path_grid:
-                                # Convert back to pixel coords
-                                pixel_path = [(p[0] * grid_scale, p[1] * grid_scale) for p in path_grid]
-                                delivery_drones.append({
-                                    "pos": list(start_node),
-                                    "path": pixel_path,
-                                    "path_idx": 0,
-                                    "target": end_node,
-                                    "status": "enroute",
-                                    "survivor_idx": idx
-                                })
+            in_footprint = survivor_index.query_radius(scout_pos, detection_radius)
+            newly_detected = survivors.mark_detected(in_footprint)
+            metrics.record_detections(newly_detected, step)
+            for idx in newly_detected:
+                s_pos = survivors.pos[idx]
+                
+                # Check delivery radius constraint
+                if active_delivery_sites.any_within(s_pos, delivery_radius_pixels):
+                    continue
+                
+                # Survivors drones can't reach (no-fly zones) don't get a site, so they can't shadow reachable neighbours
+                if single_drone_mode:
+                    if not router.reachable(home_cell, self._grid_cell(s_pos, grid_scale)):
+                        continue
+                    if single_drone_range is not None and 2 * np.hypot(*(s_pos - home)) > single_drone_range:
+                        continue # Out of range even on a dedicated round trip
+                    # Add to queue
+                    single_drone_queue.append(idx)
+                else:
+                    # Dispatch Delivery Drone (Multiple Mode)
+                    pixel_path = self._plan_path(router, grid_scale, home, s_pos)
+                    if pixel_path is None:
+                        continue
+                    delivery_drones.add(home, status=MOVING, path=pixel_path, survivor_idx=idx)
+                active_delivery_sites.insert(s_pos)
+                survivors.dispatched[idx] = True
 
             # --- Delivery Logic ---
             if single_drone_mode:
-                drone = delivery_drones[0]
-                
                 # Decision Making
-                if drone["status"] == "idle":
-                    scout_finished = scout_target_idx >= len(scout_path)
+                if delivery_drones.status[0] == IDLE:
+                    drone_pos = delivery_drones.pos[0]
+
+                    if not single_drone_trip and single_drone_kits > 0 and single_drone_queue:
+                        # Plan capacity/range-limited trips over everything queued and fly the first
+                        # one if it can leave from here; otherwise restock at home first
+                        flown = delivery_drones.distance[0] - trip_start_distance
+                        plan = plan_deliveries(
+                            home, survivors.pos[single_drone_queue], single_drone_capacity,
+                            max_distance=single_drone_range, start=drone_pos, start_kits=single_drone_kits,
+                            start_range=None if single_drone_range is None else single_drone_range - flown,
+                        )
+                        if plan.trips and plan.trips[0].from_start:
+                            single_drone_trip = [single_drone_queue[i] for i in plan.trips[0].stops]
+                            planned = set(single_drone_trip)
+                            single_drone_queue = [idx for idx in single_drone_queue if idx not in planned]
+                        else:
+                            single_drone_reloading = True
                     
                     # Check for Reload condition
-                    if single_drone_kits <= 0:
+                    if single_drone_reloading or single_drone_kits <= 0:
                         # Must reload
-                        start_node = tuple(map(int, drone["pos"]))
-                        end_node = (0, h // 2)
-                        start_grid = (start_node[0] // grid_scale, start_node[1] // grid_scale)
-                        end_grid = (end_node[0] // grid_scale, end_node[1] // grid_scale)
-                        path_grid = astar_search(grid, start_grid, end_grid)
-                        if path_grid:
-                            drone["path"] = [(p[0] * grid_scale, p[1] * grid_scale) for p in path_grid]
-                            drone["path_idx"] = 0
-                            drone["status"] = "returning"
+                        pixel_path = self._plan_path(router, grid_scale, drone_pos, home)
+                        if pixel_path is not None:
+                            delivery_drones.set_path(0, pixel_path)
+                            delivery_drones.status[0] = RETURNING
+                            single_drone_reloading = True
                             # Note: We don't set completed here, we are returning to reload
                     
-                    elif single_drone_queue:
-                        # Have kits, have targets -> Go deliver
-                        best_idx = -1
-                        min_dist = float('inf')
-                        
-                        for s_idx in single_drone_queue:
-                            d = np.linalg.norm(np.array(survivors[s_idx]["pos"]) - np.array(drone["pos"]))
-                            if d < min_dist:
-                                min_dist = d
-                                best_idx = s_idx
+                    elif single_drone_trip:
+                        # Have kits, on a trip -> Go deliver the next planned stop
+                        best_idx = single_drone_trip.pop(0)
                         
-                        if best_idx != -1:
-                            single_drone_queue.remove(best_idx)
-                            target_survivor = survivors[best_idx]
-                            
-                            start_node = tuple(map(int, drone["pos"]))
-                            end_node = target_survivor["pos"]
-                            
-                            start_grid = (start_node[0] // grid_scale, start_node[1] // grid_scale)
-                            end_grid = (end_node[0] // grid_scale, end_node[1] // grid_scale)
-                            
-                            path_grid = astar_search(grid, start_grid, end_grid)
-                            
-                            if path_grid:
-                                drone["path"] = [(p[0] * grid_scale, p[1] * grid_scale) for p in path_grid]
-                                drone["path_idx"] = 0
-                                drone["status"] = "moving"
-                                drone["survivor_idx"] = best_idx
-                                single_drone_kits -= 1 # Use one kit
+                        pixel_path = self._plan_path(router, grid_scale, drone_pos, survivors.pos[best_idx])
+                        if pixel_path is not None:
+                            delivery_drones.set_path(0, pixel_path)
+                            delivery_drones.status[0] = MOVING
+                            delivery_drones.survivor_idx[0] = best_idx
+                            single_drone_kits -= 1 # Use one kit
                     
-                    elif scout_finished and not single_drone_queue:
+                    elif scout_finished:
                         # No more targets, scout done -> Go home and finish
-                        start_node = tuple(map(int, drone["pos"]))
-                        end_node = (0, h // 2)
-                        start_grid = (start_node[0] // grid_scale, start_node[1] // grid_scale)
-                        end_grid = (end_node[0] // grid_scale, end_node[1] // grid_scale)
-                        path_grid = astar_search(grid, start_grid, end_grid)
-                        if path_grid:
-                            drone["path"] = [(p[0] * grid_scale, p[1] * grid_scale) for p in path_grid]
-                            drone["path_idx"] = 0
-                            drone["status"] = "returning"
+                        pixel_path = self._plan_path(router, grid_scale, drone_pos, home)
+                        if pixel_path is not None:
+                            delivery_drones.set_path(0, pixel_path)
+                            delivery_drones.status[0] = RETURNING
 
                 # Movement Logic
-                if drone["status"] in ["moving", "returning"]:
-                    if drone["path_idx"] < len(drone["path"]):
-                        target = drone["path"][drone["path_idx"]]
-                        d_dist = np.linalg.norm(np.array(target) - np.array(drone["pos"]))
-                        
-                        if d_dist < delivery_speed:
-                            drone["pos"] = list(target)
-                            drone["path_idx"] += 1
-                        else:
-                            direction = (np.array(target) - np.array(drone["pos"])) / d_dist
-                            drone["pos"][0] += direction[0] * delivery_speed
-                            drone["pos"][1] += direction[1] * delivery_speed
+                for i in delivery_drones.step():
+                    # Reached destination
+                    if delivery_drones.status[i] == MOVING:
+                        # Delivered
+                        survivors.delivered[delivery_drones.survivor_idx[i]] = True
+                        metrics.record_delivery(delivery_drones.survivor_idx[i], step, i)
+                        delivery_drones.status[i] = IDLE
+                    elif single_drone_reloading:
+                        # Reached Home, reloading
+                        single_drone_kits = single_drone_capacity
+                        single_drone_reloading = False
+                        trip_start_distance = delivery_drones.distance[i]
+                        metrics.record_reload()
+                        delivery_drones.status[i] = IDLE # Ready to go out again
                     else:
-                        # Reached destination
-                        if drone["status"] == "moving":
-                            # Delivered
-                            survivors[drone["survivor_idx"]]["delivered"] = True
-                            drone["status"] = "idle"
-                        elif drone["status"] == "returning":
-                            # Reached Home
-                            if single_drone_kits <= 0:
-                                # Reloading
-                                single_drone_kits = single_drone_capacity
-                                drone["status"] = "idle" # Ready to go out again
-                            else:
-                                # Mission Complete
-                                drone["status"] = "completed"
+                        # Reached Home, mission complete
+                        delivery_drones.status[i] = COMPLETED
 
             else:
                 # Multiple Drone Logic
-                for drone in delivery_drones:
-                    if drone["path_idx"] < len(drone["path"]):
-                        target = drone["path"][drone["path_idx"]]
-                        d_dist = np.linalg.norm(np.array(target) - np.array(drone["pos"]))
-                        
-                        if d_dist < delivery_speed:
-                            drone["pos"] = list(target)
-                            drone["path_idx"] += 1
-                        else:
-                            direction = (np.array(target) - np.array(drone["pos"])) / d_dist
-                            drone["pos"][0] += direction[0] * delivery_speed
-                            drone["pos"][1] += direction[1] * delivery_speed
+                for i in delivery_drones.step():
+                    # Reached target
+                    if delivery_drones.status[i] == MOVING:
+                        survivors.delivered[delivery_drones.survivor_idx[i]] = True
+                        metrics.record_delivery(delivery_drones.survivor_idx[i], step, i)
+                        # Reverse path to go home
+                        delivery_drones.set_path(i, delivery_drones.path(i), reverse=True)
+                        delivery_drones.status[i] = RETURNING
                     else:
-                        # Reached target
-                        if drone["status"] == "enroute":
-                            survivors[drone["survivor_idx"]]["delivered"] = True
-                            drone["status"] = "returning"
-                            # Reverse path to go home
-                            drone["path"] = drone["path"][::-1]
-                            drone["path_idx"] = 0
-                        elif drone["status"] == "returning":
-                            drone["status"] = "completed"
+                        delivery_drones.status[i] = COMPLETED
 
-            # --- Visualization ---
-            # Draw Survivors
-            for s in survivors:
-                color = (0, 0, 255) # Red (Undetected)
-                if s["delivered"]:
-                    color = (0, 255, 0) # Green (Delivered)
-                elif s["detected"]:
-                    color = (0, 255, 255) # Yellow (Detected)
-                
-                cv2.circle(frame, s["pos"], 10, color, -1)
-                if s["detected"]:
-                    cv2.rectangle(frame, (s["box"][0], s["box"][1]), (s["box"][2], s["box"][3]), color, 2)
-
-            # Draw Scout
-            cv2.circle(frame, (int(scout_pos[0]), int(scout_pos[1])), 8, (255, 255, 255), -1)
-            cv2.putText(frame, "SCOUT", (int(scout_pos[0])+10, int(scout_pos[1])), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            
-            # Draw Scout Path (Lawn Mower) - Optional, maybe too cluttered
-            # for i in range(len(scout_path)-1):
-            #     cv2.line(frame, scout_path[i], scout_path[i+1], (50, 50, 50), 1)
-
-            # Draw Delivery Drones
-            for drone in delivery_drones:
-                if drone["status"] != "completed":
-                    cv2.circle(frame, (int(drone["pos"][0]), int(drone["pos"][1])), 8, (255, 100, 0), -1)
-                    cv2.putText(frame, "DELIVERY", (int(drone["pos"][0])+10, int(drone["pos"][1])), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 100, 0), 1)
-
-            # Overlay Info
-            cv2.putText(frame, f"Survivors: {survivor_count}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            found_count = sum(1 for s in survivors if s["detected"])
-            delivered_count = sum(1 for s in survivors if s["delivered"])
-            cv2.putText(frame, f"Detected: {found_count}", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
-            cv2.putText(frame, f"Delivered: {delivered_count}", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            if single_drone_mode:
-                 cv2.putText(frame, f"Kits: {single_drone_kits}/{single_drone_capacity}", (20, 160), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 165, 255), 2)
-
-            frames.append(frame)
-            step += 1
-            
-            # End condition: All delivered and drones returned
-            all_delivered = all(s["delivered"] for s in survivors)
-            all_returned = all(d["status"] == "completed" for d in delivery_drones)
-            
+            # End condition: scout done, every dispatched site served and drones back home.
+            # Survivors covered by a neighbouring delivery site never get a drone of their own,
+            # so they must not keep the simulation running until max_steps.
             # In single drone mode, we might be "idle" but waiting for scout to find more, or "returning" to reload
             # So we only break if scout is done AND queue is empty AND drone is completed
+            n_drones = len(delivery_drones)
+            all_returned = bool((delivery_drones.status[:n_drones] == COMPLETED).all())
             
             if single_drone_mode:
-                if scout_target_idx >= len(scout_path) and not single_drone_queue and delivery_drones[0]["status"] == "completed":
-                    break
+                done = scout_finished and not single_drone_queue and not single_drone_trip and all_returned
             else:
-                if all_delivered and all_returned and scout_target_idx >= len(scout_path):
-                    break
-            
-            # Safety break
-            if step >= max_steps:
-                break
+                all_delivered = bool(survivors.delivered[survivors.dispatched].all())
+                done = all_delivered and all_returned and scout_finished
+            final = done or step + 1 >= max_steps
 
-        if not frames:
-            print("Error: No frames generated during simulation.")
-            raise ValueError("Simulation failed to generate any frames.")
+            # --- Visualization ---
+            # Skipped ticks still advance the mission; the renderer catches up on the next drawn frame
+            budget_left = max_frames is None or rendered < max_frames - 1
+            if renderer is not None and (final or (step % frame_stride == 0 and budget_left)):
+                visible_drones = delivery_drones.pos[:n_drones][delivery_drones.status[:n_drones] != COMPLETED]
+                hud_lines = [
+                    (f"Survivors: {survivor_count}", (255, 255, 255)),
+                    (f"Detected: {int(survivors.detected.sum())}", (255, 255, 0)),
+                    (f"Delivered: {int(survivors.delivered.sum())}", (0, 255, 0)),
+                ]
+                if single_drone_mode:
+                    hud_lines.append((f"Kits: {single_drone_kits}/{single_drone_capacity}", (0, 165, 255)))
 
-        # 5. Generate Video
-        # Try using avc1 (H.264) which is browser friendly
-        video_filename = "simulation.mp4"
-        video_path = os.path.join(job_dir, video_filename)
-        
-        # Try avc1 first
-        fourcc = cv2.VideoWriter_fourcc(*'avc1')
-        out = cv2.VideoWriter(video_path, fourcc, 30, (w, h))
-        
-        if not out.isOpened():
-            print("Warning: avc1 codec not available, falling back to mp4v")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(video_path, fourcc, 30, (w, h))
+                yield renderer.render(survivors, scout_pos, visible_drones, hud_lines)
+                rendered += 1
 
-        if not out.isOpened():
-             raise RuntimeError("Could not open VideoWriter with avc1 or mp4v")
+            step += 1
+            if progress_callback is not None:
+                progress_callback(step, survivor_count, int(survivors.detected.sum()), int(survivors.delivered.sum()))
+            if done:
+                break
 
-        for f in frames:
-            out.write(f)
-        out.release()
+        metrics.finish(step, done, survivors, scout, delivery_drones)
 
-        print(f"Video generated at {video_path} with {len(frames)} frames.")
+    def routing_grid(self, image, survivors: SurvivorState, params: SimulationParams,
+                     no_fly_mask: Optional[str] = None) -> np.ndarray:
+        """Occupancy grid for routing over `image`, keeping home and every survivor reachable."""
+        h, w = image.shape[:2]
+        mask = load_no_fly_mask(no_fly_mask, (w, h)) if no_fly_mask else None
+        home = (0, h // 2)
+        keep_free = [self._grid_cell(p, params.grid_scale) for p in [home, *survivors.pos]]
+        return build_occupancy_grid(image, (w, h), params.grid_scale, mode=params.obstacle_mode,
+                                    threshold=params.obstacle_threshold, fill=params.obstacle_fill,
+                                    no_fly_mask=mask, keep_free=keep_free)
 
-        return {
-            "job_id": job_id,
-            "survivors_count": survivor_count,
-            "video_url": f"/static/simulations/{job_id}/{video_filename}"
-        }
+    def _output_size(self, w, h, output_width=None):
+        """Video frame size for a requested width: aspect kept, never upscaled, even dimensions for H.264."""
+        if not output_width or output_width >= w:
+            out_w, out_h = w, h
+        else:
+            out_w, out_h = output_width, round(h * output_width / w)
+        return (max(2, out_w - out_w % 2), max(2, out_h - out_h % 2))
+
+    def _grid_cell(self, pos, grid_scale):
+        return (int(pos[0]) // grid_scale, int(pos[1]) // grid_scale)
+
+    def _plan_path(self, router: Router, grid_scale, start, end):
+        """Routes between two pixel positions; returns the path in pixel coords or None."""
+        path_grid = router.path(self._grid_cell(start, grid_scale), self._grid_cell(end, grid_scale))
+        if path_grid is None or len(path_grid) == 0:
+            return None
+        # Convert back to pixel coords
+        return path_grid.astype(np.float64) * grid_scale
 
     def _generate_lawn_mower_path(self, w, h, step=100):
         path = []
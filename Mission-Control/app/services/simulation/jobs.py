@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import Enum
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from app.core.config import settings
+
+PROGRESS_INTERVAL = 0.25 # Seconds between progress updates sent by workers
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class SimulationJob(BaseModel):
+    id: str
+    status: JobStatus = JobStatus.QUEUED
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    step: int = 0
+    survivors_total: int = 0
+    survivors_detected: int = 0
+    survivors_delivered: int = 0
+    video_url: Optional[str] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _run_job(job_id: str, image_path: str, options: dict, progress, cancelled) -> Optional[dict]:
+    """
+    Worker-process entry point. The engine (and its model) is imported lazily so
+    each worker loads the weights once and reuses them across jobs.
+    Returns None when the job was cancelled while running.
+    """
+    from app.services.simulation.engine import simulation_engine, SimulationCancelled
+
+    progress[job_id] = {"started_at": time.time()}
+    last_update = 0.0
+
+    def on_progress(step, total, detected, delivered):
+        nonlocal last_update
+        now = time.time()
+        if now - last_update < PROGRESS_INTERVAL:
+            return
+        last_update = now
+        if cancelled.get(job_id):
+            raise SimulationCancelled()
+        progress[job_id] = {
+            "started_at": progress[job_id]["started_at"],
+            "step": step,
+            "survivors_total": total,
+            "survivors_detected": detected,
+            "survivors_delivered": delivered,
+        }
+
+    try:
+        return simulation_engine.run_simulation(image_path, job_id=job_id, progress_callback=on_progress, **options)
+    except SimulationCancelled:
+        return None
+    except Exception as e:
+        traceback.print_exc()
+        # Custom exception types may not unpickle in the API process
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    finally:
+        for path in (image_path, options.get("no_fly_mask")):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+class SimulationJobManager:
+    """
+    Runs simulations on a bounded process pool.
+    Workers report progress and read cancellation flags through a shared
+    multiprocessing manager; job records live in this (API) process.
+    """
+
+    def __init__(self, max_workers: int = settings.SIMULATION_WORKERS,
+                 max_pending: int = settings.SIMULATION_MAX_PENDING_JOBS,
+                 history: int = settings.SIMULATION_JOB_HISTORY):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.history = history
+        self.jobs: Dict[str, SimulationJob] = {}
+        self._futures: Dict[str, Future] = {}
+        self._inputs: Dict[str, List[str]] = {}
+        self._lock = threading.RLock() # Future callbacks may fire while it is held
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+
+    def _ensure_pool(self):
+        # Started lazily so importing the API doesn't spawn processes.
+        # "spawn" keeps workers from inheriting the server's camera and drone threads.
+        if self._pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            self._manager = ctx.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+
+    def submit(self, image_path: str, **options) -> SimulationJob:
+        with self._lock:
+            pending = sum(1 for j in self.jobs.values() if j.status not in FINISHED_STATUSES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} simulation jobs already pending")
+            self._ensure_pool()
+            job = SimulationJob(id=str(uuid.uuid4()), submitted_at=time.time())
+            self.jobs[job.id] = job
+            future = self._pool.submit(_run_job, job.id, image_path, options, self._progress, self._cancelled)
+            self._futures[job.id] = future
+            self._inputs[job.id] = [p for p in (image_path, options.get("no_fly_mask")) if p]
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f))
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._sync_progress(job)
+            return job
+
+    def list(self) -> List[SimulationJob]:
+        with self._lock:
+            for job in self.jobs.values():
+                self._sync_progress(job)
+            return sorted(self.jobs.values(), key=lambda j: j.submitted_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        """Cancels a queued job immediately, or flags a running one to stop at its next progress update."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return job
+            future = self._futures.get(job_id)
+            # A successful cancel() runs _on_done right away
+            if future is None or not future.cancel():
+                self._cancelled[job_id] = True
+            return job
+
+    def shutdown(self):
+        if self._pool is not None:
+            for job_id in list(self._futures):
+                self._cancelled[job_id] = True
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._manager.shutdown()
+            self._pool = None
+
+    def _sync_progress(self, job: SimulationJob):
+        if job.status in FINISHED_STATUSES or self._progress is None:
+            return
+        data = self._progress.get(job.id)
+        if data:
+            job.status = JobStatus.RUNNING
+            job.started_at = data.get("started_at")
+            job.step = data.get("step", job.step)
+            job.survivors_total = data.get("survivors_total", job.survivors_total)
+            job.survivors_detected = data.get("survivors_detected", job.survivors_detected)
+            job.survivors_delivered = data.get("survivors_delivered", job.survivors_delivered)
+
+    def _on_done(self, job_id: str, future: Future):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return
+            self._sync_progress(job)
+            if future.cancelled():
+                self._finish(job, JobStatus.CANCELLED)
+                return
+            error = future.exception()
+            if error is not None:
+                job.error = str(error)
+                self._finish(job, JobStatus.FAILED)
+                return
+            result = future.result()
+            if result is None:
+                self._finish(job, JobStatus.CANCELLED)
+                return
+            job.result = result
+            job.video_url = result.get("video_url")
+            job.survivors_total = result.get("survivors_count", job.survivors_total)
+            self._finish(job, JobStatus.COMPLETED)
+
+    def _finish(self, job: SimulationJob, status: JobStatus):
+        job.status = status
+        job.finished_at = time.time()
+        self._futures.pop(job.id, None)
+        for path in self._inputs.pop(job.id, []):
+            if os.path.exists(path):
+                os.remove(path) # Never picked up by a worker
+        if self._progress is not None:
+            self._progress.pop(job.id, None)
+            self._cancelled.pop(job.id, None)
+
+        # Forget the oldest finished jobs beyond the history limit
+        finished = [j for j in self.jobs.values() if j.status in FINISHED_STATUSES]
+        if len(finished) > self.history:
+            finished.sort(key=lambda j: j.finished_at)
+            for old in finished[:len(finished) - self.history]:
+                del self.jobs[old.id]
+
+
+job_manager = SimulationJobManager()
@@ -0,0 +1,74 @@
+import numpy as np
+from app.services.simulation.state import SurvivorState, DroneFleet
+
+
+class MissionMetrics:
+    """Collects mission KPIs while a simulation runs. Steps are simulation ticks (0-based)."""
+
+    def __init__(self, survivor_count: int):
+        self.steps = 0
+        self.completed = False # Mission finished before max_steps
+        self.reloads = 0 # Trips home to restock kits (single drone mode)
+        self.detected_step = np.full(survivor_count, -1, dtype=np.int64)
+        self.delivered_step = np.full(survivor_count, -1, dtype=np.int64)
+        self.delivered_by = np.full(survivor_count, -1, dtype=np.int64) # Delivery drone index
+        self.summary = None # Set by finish()
+
+    def record_detections(self, indices: np.ndarray, step: int):
+        self.detected_step[indices] = step
+
+    def record_delivery(self, survivor_idx: int, step: int, drone_idx: int = -1):
+        self.delivered_step[survivor_idx] = step
+        self.delivered_by[survivor_idx] = drone_idx
+
+    def record_reload(self):
+        self.reloads += 1
+
+    def delivery_latencies(self) -> np.ndarray:
+        """Ticks from detection to kit delivery, for survivors that got their own kit."""
+        delivered = self.delivered_step >= 0
+        return self.delivered_step[delivered] - self.detected_step[delivered]
+
+    def finish(self, steps: int, completed: bool, survivors: SurvivorState, scout: DroneFleet,
+               delivery_drones: DroneFleet) -> dict:
+        self.steps = steps
+        self.completed = bool(completed)
+        self.summary = self.report(survivors, scout, delivery_drones)
+        return self.summary
+
+    def report(self, survivors: SurvivorState, scout: DroneFleet, delivery_drones: DroneFleet) -> dict:
+        latencies = self.delivery_latencies()
+        n_drones = len(delivery_drones)
+        deliveries = np.bincount(self.delivered_by[self.delivered_by >= 0], minlength=n_drones)
+        return {
+            "steps": self.steps,
+            "completed": self.completed,
+            "survivors": len(survivors),
+            "detected": int(survivors.detected.sum()),
+            "delivery_sites": int(survivors.dispatched.sum()),
+            "delivered": int(survivors.delivered.sum()),
+            "reloads": self.reloads,
+            "mean_delivery_latency": float(latencies.mean()) if latencies.size else None,
+            "max_delivery_latency": int(latencies.max()) if latencies.size else None,
+            "delivery_latencies": latencies.tolist(),
+            "scout_distance": float(scout.distance[:len(scout)].sum()),
+            "delivery_distance": float(delivery_drones.distance[:n_drones].sum()),
+            "survivor_log": [
+                {
+                    "survivor": i,
+                    "detected_step": int(self.detected_step[i]) if self.detected_step[i] >= 0 else None,
+                    "delivered_step": int(self.delivered_step[i]) if self.delivered_step[i] >= 0 else None,
+                    "drone": int(self.delivered_by[i]) if self.delivered_by[i] >= 0 else None,
+                }
+                for i in range(len(survivors))
+            ],
+            "drones": [
+                {
+                    "drone": i,
+                    "distance": float(delivery_drones.distance[i]),
+                    "idle_steps": int(delivery_drones.idle_ticks[i]),
+                    "deliveries": int(deliveries[i]),
+                }
+                for i in range(n_drones)
+            ],
+        }
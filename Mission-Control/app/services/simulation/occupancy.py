@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+from typing import Iterable, Optional, Tuple
+
+# How image pixels are classified as obstacles before binning into grid cells
+OBSTACLE_MODES = ("none", "dark", "bright")
+
+
+def load_no_fly_mask(path: str, size: Tuple[int, int]) -> np.ndarray:
+    """Reads a no-fly mask image (any non-black pixel is no-fly) and fits it to the (w, h) frame size."""
+    mask = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        raise ValueError("Could not load no-fly mask")
+    if (mask.shape[1], mask.shape[0]) != tuple(size):
+        mask = cv2.resize(mask, tuple(size), interpolation=cv2.INTER_NEAREST)
+    return mask > 0
+
+
+def build_occupancy_grid(image: Optional[np.ndarray], size: Tuple[int, int], grid_scale: int,
+                         mode: str = "none", threshold: int = 60, fill: float = 0.5,
+                         no_fly_mask: Optional[np.ndarray] = None,
+                         keep_free: Iterable[Tuple[int, int]] = ()) -> np.ndarray:
+    """
+    Routing grid (0 = free, 1 = obstacle) with one cell per grid_scale x grid_scale pixels.
+
+    mode: "dark" blocks pixels with grey level below `threshold`, "bright" those above it,
+        "none" ignores the imagery. A cell is blocked once `fill` of its pixels are.
+    no_fly_mask: boolean (h, w) pixel mask; any no-fly pixel blocks its whole cell.
+    keep_free: (x, y) cells (home, survivors) that thresholding must not block, since the
+        drones have to reach them. No-fly cells stay blocked.
+    """
+    if mode not in OBSTACLE_MODES:
+        raise ValueError(f"Unknown obstacle mode '{mode}', expected one of {', '.join(OBSTACLE_MODES)}")
+    w, h = size
+    grid_w, grid_h = w // grid_scale, h // grid_scale
+    crop_h, crop_w = grid_h * grid_scale, grid_w * grid_scale
+
+    def bin_cells(pixels: np.ndarray) -> np.ndarray:
+        # Fraction of flagged pixels per cell
+        return pixels[:crop_h, :crop_w].reshape(grid_h, grid_scale, grid_w, grid_scale).mean(axis=(1, 3))
+
+    grid = np.zeros((grid_h, grid_w), dtype=np.int8)
+    if mode != "none" and image is not None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        pixels = gray < threshold if mode == "dark" else gray > threshold
+        grid[bin_cells(pixels) >= fill] = 1
+        for x, y in keep_free:
+            if 0 <= x < grid_w and 0 <= y < grid_h:
+                grid[y, x] = 0
+
+    if no_fly_mask is not None:
+        grid[bin_cells(no_fly_mask) > 0] = 1
+    return grid
@@ -0,0 +1,21 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class SimulationParams(BaseModel):
+    """Tunable mission parameters. Distances are in source-image pixels, speeds in pixels per tick."""
+    single_drone_mode: bool = False
+    scout_speed: float = 10
+    delivery_speed: float = 15
+    single_drone_capacity: int = 20 # Kits carried before returning home to reload
+    single_drone_range: Optional[float] = None # Max distance per trip from home and back (battery), None = unlimited
+    detection_radius: float = 100 # Scout sensor footprint
+    delivery_radius: float = 50 # One kit serves everyone within this radius (approx 10m)
+    sweep_spacing: int = 100 # Distance between lawn mower passes
+    grid_scale: int = 10 # Pixels per routing grid cell
+    obstacle_mode: str = "none" # Obstacles from imagery: "none", "dark" or "bright" pixels (see occupancy.py)
+    obstacle_threshold: int = 60 # Grey level separating obstacle pixels
+    obstacle_fill: float = 0.5 # Fraction of obstacle pixels that blocks a grid cell
+    tile_size: int = Field(0, ge=0) # Sliced inference tile in pixels for large images, 0 = whole frame (see tiling.py)
+    tile_overlap: float = Field(0.2, ge=0, lt=1) # Fraction of a tile shared with its neighbour
+    max_steps: int = 5000
@@ -1,24 +1,26 @@
 import heapq
+import math
 import numpy as np
 from typing import List, Tuple, Optional
 
-class Node:
-    def __init__(self, position: Tuple[int, int], parent=None):
-        self.position = position
-        self.parent = parent
-        self.g = 0  # Cost from start to current node
-        self.h = 0  # Heuristic (estimated cost from current to end)
-        self.f = 0  # Total cost
-
-    def __eq__(self, other):
-        return self.position == other.position
-    
-    def __lt__(self, other):
-        return self.f < other.f
+SQRT2 = math.sqrt(2)
 
 def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
-    # Euclidean distance
-    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
+    # Octile distance: exact cost on an obstacle-free 8-connected grid
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return dx + dy + (SQRT2 - 2) * min(dx, dy)
+
+def _padded(grid: np.ndarray):
+    """Flattened obstacle mask with a one-cell ring of obstacles, its row width and 8-neighbour offsets."""
+    h, w = grid.shape
+    pw = w + 2
+    blocked = np.ones((h + 2, pw), dtype=bool)
+    blocked[1:-1, 1:-1] = grid != 0
+    # N, S, W, E, then diagonals
+    offsets = np.array([-pw, pw, -1, 1, -pw - 1, -pw + 1, pw - 1, pw + 1], dtype=np.int64)
+    return blocked.ravel(), pw, offsets
+
+STEP_COSTS = np.array([1, 1, 1, 1, SQRT2, SQRT2, SQRT2, SQRT2])
 
 def astar_search(grid: np.ndarray, start: Tuple[int, int], end: Tuple[int, int]) -> Optional[List[Tuple[int, int]]]:
     """
@@ -27,68 +29,196 @@ def astar_search(grid: np.ndarray, start: Tuple[int, int], end: Tuple[int, int])
     start: (x, y) tuple
     end: (x, y) tuple
     Returns: List of (x, y) tuples representing the path.
+
+    Moves are 8-connected; straight steps cost 1 and diagonal steps sqrt(2),
+    matching the octile heuristic so returned paths are shortest.
+    Search state lives in flat arrays indexed by y * width + x.
     """
-    
+
     # Check bounds
     h, w = grid.shape
     if not (0 <= start[0] < w and 0 <= start[1] < h):
         return None
     if not (0 <= end[0] < w and 0 <= end[1] < h):
         return None
-        
+
     # If start or end is an obstacle, return None
     # Note: In our simulation, we might assume open air, but this is good for robustness
     if grid[end[1], end[0]] == 1:
         return None
 
-    start_node = Node(start, None)
-    end_node = Node(end, None)
+    # Pad with a ring of obstacles so neighbour lookups never need bounds checks
+    blocked, pw, offsets = _padded(grid)
+
+    g_score = np.full(blocked.size, np.inf)
+    parent = np.full(blocked.size, -1, dtype=np.int64)
+    closed = np.zeros(blocked.size, dtype=bool)
 
-    open_list = []
-    closed_set = set()
+    start_idx = (start[1] + 1) * pw + start[0] + 1
+    end_idx = (end[1] + 1) * pw + end[0] + 1
+    end_x, end_y = end
 
-    heapq.heappush(open_list, start_node)
+    g_score[start_idx] = 0.0
+    # Heap entries are (f, -g, index): among equal f, prefer nodes closer to the goal
+    open_heap = [(round(heuristic(start, end), 6), 0.0, start_idx)]
 
-    while open_list:
-        current_node = heapq.heappop(open_list)
-        closed_set.add(current_node.position)
+    while open_heap:
+        _, _, current = heapq.heappop(open_heap)
+        if closed[current]:
+            continue # Stale entry, node was already expanded via a cheaper path
 
         # Found the goal
-        if current_node == end_node:
+        if current == end_idx:
             path = []
-            current = current_node
-            while current is not None:
-                path.append(current.position)
-                current = current.parent
+            while current != -1:
+                path.append((int(current % pw) - 1, int(current // pw) - 1))
+                current = parent[current]
             return path[::-1]  # Return reversed path
 
-        # Generate children (8 directions)
-        children = []
-        for new_position in [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]:
-            node_position = (current_node.position[0] + new_position[0], current_node.position[1] + new_position[1])
+        closed[current] = True
 
-            # Check within range
-            if node_position[0] > (w - 1) or node_position[0] < 0 or node_position[1] > (h - 1) or node_position[1] < 0:
-                continue
+        neighbours = current + offsets
+        open_mask = ~(blocked[neighbours] | closed[neighbours])
+        tentative = g_score[current] + STEP_COSTS[open_mask]
+        neighbours = neighbours[open_mask]
 
-            # Check walkable terrain
-            if grid[node_position[1], node_position[0]] != 0:
-                continue
+        better = tentative < g_score[neighbours]
+        if not better.any():
+            continue
+        neighbours = neighbours[better]
+        tentative = tentative[better]
+        g_score[neighbours] = tentative
+        parent[neighbours] = current
 
-            new_node = Node(node_position, current_node)
-            children.append(new_node)
+        dx = np.abs(neighbours % pw - 1 - end_x)
+        dy = np.abs(neighbours // pw - 1 - end_y)
+        # Rounded so float noise from summing sqrt(2) steps in different orders doesn't break f ties
+        f_score = np.round(tentative + dx + dy + (SQRT2 - 2) * np.minimum(dx, dy), 6)
+        for f, g, idx in zip(f_score.tolist(), tentative.tolist(), neighbours.tolist()):
+            heapq.heappush(open_heap, (f, -g, idx))
 
-        for child in children:
-            if child.position in closed_set:
-                continue
+    return None
+
+def distance_field(grid: np.ndarray, source: Tuple[int, int]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Dijkstra flood fill from `source` over the same 8-connected grid as astar_search.
+    Returns (dist, parent), both shaped like the grid: dist is the shortest path cost
+    from source (inf where unreachable) and parent the flat index (y * width + x) of the
+    previous cell on that path (-1 for the source and unreachable cells).
+    Moves are symmetric, so tracing a cell back to the source is also its shortest way home.
+    """
+    h, w = grid.shape
+    if not (0 <= source[0] < w and 0 <= source[1] < h):
+        return None
 
-            child.g = current_node.g + 1
-            child.h = heuristic(child.position, end_node.position)
-            child.f = child.g + child.h
+    blocked, pw, offsets = _padded(grid)
+    dist = np.full(blocked.size, np.inf)
+    parent = np.full(blocked.size, -1, dtype=np.int64)
+    closed = blocked.copy() # Obstacles and the padding ring are never expanded
+
+    source_idx = (source[1] + 1) * pw + source[0] + 1
+    dist[source_idx] = 0.0
+    open_heap = [(0.0, source_idx)]
+
+    while open_heap:
+        d, current = heapq.heappop(open_heap)
+        if closed[current]:
+            continue # Stale entry
+        closed[current] = True
+
+        neighbours = current + offsets
+        open_mask = ~closed[neighbours]
+        tentative = d + STEP_COSTS[open_mask]
+        neighbours = neighbours[open_mask]
+
+        better = tentative < dist[neighbours]
+        if not better.any():
+            continue
+        neighbours = neighbours[better]
+        tentative = tentative[better]
+        dist[neighbours] = tentative
+        parent[neighbours] = current
+        for g, idx in zip(tentative.tolist(), neighbours.tolist()):
+            heapq.heappush(open_heap, (g, idx))
+
+    # Strip the padding and re-index parents into the unpadded grid
+    dist = dist.reshape(h + 2, pw)[1:-1, 1:-1].copy()
+    parent = parent.reshape(h + 2, pw)[1:-1, 1:-1]
+    parent = np.where(parent >= 0, (parent // pw - 1) * w + parent % pw - 1, -1)
+    return dist, parent
+
+def trace_path(parent: np.ndarray, target: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Follows a distance_field parent map from `target` back to its source. Returns [target, ..., source]."""
+    w = parent.shape[1]
+    flat = parent.ravel()
+    current = target[1] * w + target[0]
+    path = []
+    while current != -1:
+        path.append((current % w, current // w))
+        current = int(flat[current])
+    return path
+
+def line_of_sight(grid: np.ndarray, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+    """True if every cell on the Bresenham line from a to b is free (matches the diagonal moves A* allows)."""
+    n = max(abs(b[0] - a[0]), abs(b[1] - a[1])) + 1
+    xs = np.rint(np.linspace(a[0], b[0], n)).astype(np.int64)
+    ys = np.rint(np.linspace(a[1], b[1], n)).astype(np.int64)
+    h, w = grid.shape
+    if xs.min() < 0 or ys.min() < 0 or xs.max() >= w or ys.max() >= h:
+        return False
+    return not grid[ys, xs].any()
 
-            # Check if child is already in the open list with a lower g cost
-            # This is a simplified check; strictly we should update if we find a better path
-            # But for grid based, this is usually sufficient or we can just push duplicates
-            heapq.heappush(open_list, child)
+def smooth_path(grid: np.ndarray, path: np.ndarray) -> np.ndarray:
+    """
+    String-pulls a grid path: drops every waypoint the drone can skip by flying straight
+    to a later one with clear line of sight. Endpoints are kept.
+    """
+    if len(path) <= 2:
+        return path
+    keep = [0]
+    anchor = tuple(path[0])
+    for k in range(2, len(path)):
+        if not line_of_sight(grid, anchor, tuple(path[k])):
+            keep.append(k - 1)
+            anchor = tuple(path[k - 1])
+    keep.append(len(path) - 1)
+    return path[keep]
+
+def coarsen(grid: np.ndarray, factor: int) -> np.ndarray:
+    """Downsamples the grid by `factor`; a coarse cell is blocked only if all its fine cells are."""
+    h, w = grid.shape
+    ch, cw = -(-h // factor), -(-w // factor)
+    padded = np.ones((ch * factor, cw * factor), dtype=bool)
+    padded[:h, :w] = grid != 0
+    return padded.reshape(ch, factor, cw, factor).all(axis=(1, 3)).astype(np.int8)
 
-    return None
+def hierarchical_search(grid: np.ndarray, start: Tuple[int, int], end: Tuple[int, int], factor: int = 4,
+                        coarse: Optional[np.ndarray] = None) -> Optional[List[Tuple[int, int]]]:
+    """
+    Coarse-to-fine A*: plans on a `factor`x downsampled grid first, then searches the
+    full-resolution grid only inside a corridor around the coarse route. The result may be
+    slightly longer than the optimum; when the corridor holds no path the full grid is searched,
+    so a path is still found whenever one exists.
+    coarse: precomputed coarsen(grid, factor), to share between queries.
+    """
+    h, w = grid.shape
+    if coarse is None:
+        coarse = coarsen(grid, factor)
+    coarse_path = astar_search(coarse, (start[0] // factor, start[1] // factor), (end[0] // factor, end[1] // factor))
+    if coarse_path is None:
+        return astar_search(grid, start, end)
+
+    # Corridor: coarse route cells plus their 8 neighbours, at full resolution
+    corridor = np.zeros(coarse.shape, dtype=bool)
+    cells = np.asarray(coarse_path)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            xs = np.clip(cells[:, 0] + dx, 0, coarse.shape[1] - 1)
+            ys = np.clip(cells[:, 1] + dy, 0, coarse.shape[0] - 1)
+            corridor[ys, xs] = True
+    corridor = np.repeat(np.repeat(corridor, factor, axis=0), factor, axis=1)[:h, :w]
+
+    path = astar_search(np.where(corridor, grid, 1), start, end)
+    if path is None:
+        path = astar_search(grid, start, end)
+    return path
@@ -0,0 +1,156 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from app.services.simulation.state import SurvivorState
+
+# Survivor marker states, in drawing colors
+UNDETECTED = 0
+DETECTED = 1
+DELIVERED = 2
+SURVIVOR_COLORS = {
+    UNDETECTED: (0, 0, 255), # Red
+    DETECTED: (0, 255, 255), # Yellow
+    DELIVERED: (0, 255, 0),  # Green
+}
+
+SURVIVOR_RADIUS = 10
+DRONE_RADIUS = 8
+SCOUT_COLOR = (255, 255, 255)
+DELIVERY_COLOR = (255, 100, 0)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+Rect = Tuple[int, int, int, int] # x0, y0, x1, y1 (exclusive)
+
+
+class FrameRenderer:
+    """
+    Incremental renderer for simulation frames.
+
+    Keeps two persistent images:
+    - the static layer: background plus every survivor marker. A survivor is
+      only redrawn (clipped to its own rectangle, together with whatever
+      overlaps it) when its state changes.
+    - the canvas: static layer plus the moving drones and the text overlay.
+      Each frame only the rectangles covered by last frame's overlays are
+      restored from the static layer before the overlays are drawn again.
+
+    Frames can be rendered at a reduced output resolution via `size`; mission
+    coordinates stay in source pixels and are mapped when drawing.
+    """
+
+    def __init__(self, background: np.ndarray, survivors: SurvivorState, size: Optional[Tuple[int, int]] = None):
+        src_h, src_w = background.shape[:2]
+        self.scale = 1.0
+        if size is not None and size != (src_w, src_h):
+            self.scale = size[0] / src_w
+            background = cv2.resize(background, size, interpolation=cv2.INTER_AREA)
+        self.h, self.w = background.shape[:2]
+        self._background = background
+        self._static = background.copy()
+        self._survivor_radius = self._px(SURVIVOR_RADIUS)
+        self._drone_radius = self._px(DRONE_RADIUS)
+
+        # Bounding rect of everything a survivor can draw (circle + detection box)
+        centers = np.round(survivors.pos * self.scale).astype(np.int64)
+        boxes = np.round(survivors.box * self.scale).astype(np.int64)
+        self._centers = centers
+        self._boxes = boxes
+        r = self._survivor_radius
+        pad = 2
+        self._survivor_rects = np.stack([
+            np.minimum(centers[:, 0] - r, boxes[:, 0]) - pad,
+            np.minimum(centers[:, 1] - r, boxes[:, 1]) - pad,
+            np.maximum(centers[:, 0] + r, boxes[:, 2]) + pad + 1,
+            np.maximum(centers[:, 1] + r, boxes[:, 3]) + pad + 1,
+        ], axis=1).reshape(-1, 4)
+
+        self._drawn = np.full(len(survivors), UNDETECTED, dtype=np.int8)
+        for i in range(len(survivors)):
+            self._draw_survivor(self._static, i, 0, 0)
+
+        self._canvas = self._static.copy()
+        self._overlay_rects: List[Rect] = []
+
+    def render(self, survivors: SurvivorState, scout_pos, drone_positions: np.ndarray,
+               hud_lines: Sequence[Tuple[str, Tuple[int, int, int]]]) -> np.ndarray:
+        """
+        Updates the canvas to the current mission state and returns it.
+        The returned array is reused by the next call; copy it to keep it.
+        """
+        # 1. Survivors whose marker changed: redraw their rect in the static layer
+        state = np.full(len(survivors), UNDETECTED, dtype=np.int8)
+        state[survivors.detected] = DETECTED
+        state[survivors.delivered] = DELIVERED
+        changed = np.flatnonzero(state != self._drawn)
+        self._drawn[changed] = state[changed]
+        for i in changed:
+            rect = self._clip(self._survivor_rects[i])
+            if rect is not None:
+                self._redraw_static(rect)
+                self._restore(rect)
+
+        # 2. Erase last frame's overlays
+        for rect in self._overlay_rects:
+            self._restore(rect)
+        self._overlay_rects = []
+
+        # 3. Draw overlays (scout, delivery drones, HUD) onto the canvas
+        self._draw_marker(scout_pos, "SCOUT", SCOUT_COLOR)
+        for pos in drone_positions:
+            self._draw_marker(pos, "DELIVERY", DELIVERY_COLOR)
+        for line, (text, color) in enumerate(hud_lines):
+            self._draw_text(text, (self._px(20), self._px(40 + 40 * line)), self.scale, color, self._px(2))
+
+        return self._canvas
+
+    def _draw_survivor(self, img, i, ox, oy):
+        color = SURVIVOR_COLORS[self._drawn[i]]
+        cx, cy = self._centers[i]
+        cv2.circle(img, (int(cx - ox), int(cy - oy)), self._survivor_radius, color, -1)
+        if self._drawn[i] != UNDETECTED:
+            x1, y1, x2, y2 = self._boxes[i]
+            cv2.rectangle(img, (int(x1 - ox), int(y1 - oy)), (int(x2 - ox), int(y2 - oy)), color, self._px(2))
+
+    def _redraw_static(self, rect: Rect):
+        """Rebuilds one rect of the static layer from the background and the survivors overlapping it."""
+        x0, y0, x1, y1 = rect
+        r = self._survivor_rects
+        overlapping = np.flatnonzero((r[:, 0] < x1) & (r[:, 2] > x0) & (r[:, 1] < y1) & (r[:, 3] > y0))
+        patch = self._background[y0:y1, x0:x1].copy()
+        for j in overlapping: # Index order == full-frame drawing order
+            self._draw_survivor(patch, j, x0, y0)
+        self._static[y0:y1, x0:x1] = patch
+
+    def _restore(self, rect: Rect):
+        x0, y0, x1, y1 = rect
+        self._canvas[y0:y1, x0:x1] = self._static[y0:y1, x0:x1]
+
+    def _draw_marker(self, pos, label, color):
+        x, y = int(pos[0] * self.scale), int(pos[1] * self.scale)
+        r = self._drone_radius
+        cv2.circle(self._canvas, (x, y), r, color, -1)
+        self._track((x - r - 1, y - r - 1, x + r + 2, y + r + 2))
+        self._draw_text(label, (x + self._px(10), y), 0.5 * self.scale, color, 1)
+
+    def _px(self, value) -> int:
+        """Scales a drawing size in source pixels to output pixels (at least 1)."""
+        return max(1, int(round(value * self.scale)))
+
+    def _draw_text(self, text, org, scale, color, thickness):
+        cv2.putText(self._canvas, text, org, FONT, scale, color, thickness)
+        (tw, th), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        pad = thickness + 1
+        self._track((org[0] - pad, org[1] - th - pad, org[0] + tw + pad, org[1] + baseline + pad))
+
+    def _track(self, rect):
+        clipped = self._clip(rect)
+        if clipped is not None:
+            self._overlay_rects.append(clipped)
+
+    def _clip(self, rect):
+        x0, y0, x1, y1 = (int(v) for v in rect)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.w, x1), min(self.h, y1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return (x0, y0, x1, y1)
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from app.services.simulation.pathfinding import (
+    astar_search, coarsen, distance_field, hierarchical_search, line_of_sight, smooth_path, trace_path,
+)
+
+Cell = Tuple[int, int]
+
+
+class Router:
+    """
+    Answers grid path queries for one mission, reusing work between them.
+
+    A goal in clear line of sight is reached with a single straight segment and no search.
+    Paths to or from a registered source (home) are traced from a single Dijkstra
+    distance field computed once per grid. Other point-to-point queries go through
+    A* (coarse-to-fine once the grid has `hierarchical_min_cells` cells) and are kept in an
+    LRU cache keyed on (grid version, start, goal). With `smooth`, searched paths are
+    string-pulled into any-angle segments. Cells in different connected regions are
+    rejected up front instead of exhausting the grid.
+    The grid is copied and frozen; change obstacles with set_grid, which bumps the
+    version and drops every cached field and path.
+    """
+
+    def __init__(self, grid: np.ndarray, sources=(), cache_size: int = 256, smooth: bool = True,
+                 coarse_factor: int = 4, hierarchical_min_cells: int = 40000):
+        self.cache_size = cache_size
+        self.smooth = smooth
+        self.coarse_factor = coarse_factor
+        self.hierarchical_min_cells = hierarchical_min_cells
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._paths: "OrderedDict[tuple, Optional[np.ndarray]]" = OrderedDict()
+        self._fields: Dict[Cell, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._sources = [tuple(s) for s in sources]
+        self._load(grid)
+
+    def _load(self, grid: np.ndarray):
+        self.grid = np.array(grid, copy=True)
+        self.grid.flags.writeable = False
+        self._paths.clear()
+        self._fields = {source: None for source in self._sources} # Built lazily on first use
+        self._coarse = None
+        self._labels = None
+
+    def set_grid(self, grid: np.ndarray):
+        """Replaces the obstacle grid; every cached result for the old grid is invalidated."""
+        self.version += 1
+        self._load(grid)
+
+    def add_source(self, cell: Cell):
+        """Registers a cell whose paths to and from every other cell come from a distance field."""
+        cell = tuple(cell)
+        if cell not in self._fields:
+            self._sources.append(cell)
+            self._fields[cell] = None
+
+    def field(self, source: Cell) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(dist, parent) arrays for a registered source, computed on first request."""
+        source = tuple(source)
+        if self._fields.get(source) is None:
+            self._fields[source] = distance_field(self.grid, source)
+        return self._fields[source]
+
+    def distance(self, source: Cell, cell: Cell) -> float:
+        """Shortest path cost between a registered source and `cell` (inf if unreachable)."""
+        dist, _ = self.field(source) or (None, None)
+        if dist is None or not self._in_bounds(cell):
+            return float("inf")
+        return float(dist[cell[1], cell[0]])
+
+    def reachable(self, start: Cell, goal: Cell) -> bool:
+        """True if both cells are free and connected (8-connected, like the searches)."""
+        if not (self._in_bounds(start) and self._in_bounds(goal)):
+            return False
+        if self._labels is None:
+            _, self._labels = cv2.connectedComponents((self.grid == 0).astype(np.uint8), connectivity=8)
+        label = self._labels[start[1], start[0]]
+        return label != 0 and label == self._labels[goal[1], goal[0]]
+
+    def path(self, start: Cell, goal: Cell) -> Optional[np.ndarray]:
+        """Path as an (n, 2) int array of (x, y) waypoint cells, or None. Treat the result as read-only."""
+        start, goal = tuple(start), tuple(goal)
+        if self.smooth and line_of_sight(self.grid, start, goal):
+            return np.asarray([start] if start == goal else [start, goal], dtype=np.int64)
+        if not self.reachable(start, goal):
+            return None
+        if start in self._fields:
+            return self._from_field(start, goal, reverse=True)
+        if goal in self._fields:
+            return self._from_field(goal, start, reverse=False)
+        return self._cached(start, goal)
+
+    def _from_field(self, source: Cell, cell: Cell, reverse: bool) -> Optional[np.ndarray]:
+        _, parent = self.field(source)
+        path = self._finish(np.asarray(trace_path(parent, cell), dtype=np.int64)) # cell -> source
+        return path[::-1] if reverse else path
+
+    def _cached(self, start: Cell, goal: Cell) -> Optional[np.ndarray]:
+        key = (self.version, start, goal)
+        if key in self._paths:
+            self.hits += 1
+            self._paths.move_to_end(key)
+            return self._paths[key]
+        reverse_key = (self.version, goal, start)
+        if reverse_key in self._paths:
+            # Moves are symmetric, so the reversed path is just as short
+            self.hits += 1
+            self._paths.move_to_end(reverse_key)
+            cached = self._paths[reverse_key]
+            return None if cached is None else cached[::-1]
+
+        self.misses += 1
+        if self.grid.size >= self.hierarchical_min_cells:
+            if self._coarse is None:
+                self._coarse = coarsen(self.grid, self.coarse_factor)
+            path = hierarchical_search(self.grid, start, goal, self.coarse_factor, coarse=self._coarse)
+        else:
+            path = astar_search(self.grid, start, goal)
+        path = None if not path else self._finish(np.asarray(path, dtype=np.int64))
+        self._paths[key] = path
+        if len(self._paths) > self.cache_size:
+            self._paths.popitem(last=False)
+        return path
+
+    def _finish(self, path: np.ndarray) -> np.ndarray:
+        return smooth_path(self.grid, path) if self.smooth else path
+
+    def _in_bounds(self, cell: Cell) -> bool:
+        h, w = self.grid.shape
+        return 0 <= cell[0] < w and 0 <= cell[1] < h
@@ -0,0 +1,127 @@
+import math
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+class UniformGrid:
+    """
+    Uniform-grid spatial hash over 2D points.
+    Points are bucketed into square cells of `cell_size`; a radius query only
+    looks at the cells overlapping the query circle, so its cost depends on the
+    local density instead of the total number of points.
+    """
+
+    def __init__(self, cell_size: float, points: Optional[np.ndarray] = None):
+        self.cell_size = float(cell_size)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._points = np.zeros((16, 2), dtype=np.float64)
+        self._count = 0
+        if points is not None and len(points):
+            self._bulk_load(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points[:self._count]
+
+    def insert(self, point) -> int:
+        """Adds a point and returns its index."""
+        if self._count == len(self._points):
+            grown = np.zeros((2 * len(self._points), 2), dtype=np.float64)
+            grown[:self._count] = self._points[:self._count]
+            self._points = grown
+        i = self._count
+        self._points[i] = point
+        self._count += 1
+        self._cells.setdefault(self._cell_of(self._points[i]), []).append(i)
+        return i
+
+    def query_radius(self, center, radius: float) -> np.ndarray:
+        """Returns sorted indices of points strictly closer than radius to center."""
+        candidates = self._candidates(center, radius)
+        if candidates.size == 0:
+            return candidates
+        delta = self._points[candidates] - center
+        inside = (delta[:, 0] ** 2 + delta[:, 1] ** 2) < radius * radius
+        return np.sort(candidates[inside])
+
+    def any_within(self, center, radius: float) -> bool:
+        candidates = self._candidates(center, radius)
+        if candidates.size == 0:
+            return False
+        delta = self._points[candidates] - center
+        return bool(((delta[:, 0] ** 2 + delta[:, 1] ** 2) < radius * radius).any())
+
+    def k_nearest(self, k: int, chunk: int = 512) -> np.ndarray:
+        """
+        The k nearest other points of every indexed point, closest first, as an (n, k) array.
+        Each cell's points are compared only with the cells around it; the ring doubles until
+        the k-th candidate is closer than anything outside it could be. Rows are processed
+        `chunk` at a time so a crowded cell never builds a large distance block.
+        """
+        n = self._count
+        k = min(k, n - 1)
+        result = np.zeros((n, max(k, 0)), dtype=np.int64)
+        if k <= 0:
+            return result
+        points = self.points
+        for (cx, cy), members in self._cells.items():
+            for lo in range(0, len(members), chunk):
+                rows = np.asarray(members[lo:lo + chunk], dtype=np.int64)
+                r = 1
+                while True:
+                    if (2 * r + 1) ** 2 >= len(self._cells):
+                        candidates = np.arange(n) # Cheaper than walking that many (mostly empty) cells
+                    else:
+                        candidates = self._cells_in(cx - r, cy - r, cx + r, cy + r)
+                    if len(candidates) > k:
+                        delta = points[rows, None, :] - points[None, candidates, :]
+                        dist = np.hypot(delta[..., 0], delta[..., 1])
+                        dist[rows[:, None] == candidates[None, :]] = np.inf # Never your own neighbour
+                        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                        near = np.take_along_axis(dist, nearest, axis=1)
+                        # Points outside the (2r+1)^2 block are at least r cells away
+                        if near.max() <= r * self.cell_size or len(candidates) == n:
+                            break
+                    r *= 2
+                order = np.argsort(near, axis=1, kind="stable")
+                result[rows] = candidates[np.take_along_axis(nearest, order, axis=1)]
+        return result
+
+    def _cell_of(self, point) -> Tuple[int, int]:
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+
+    def _candidates(self, center, radius: float) -> np.ndarray:
+        x0, y0 = self._cell_of((center[0] - radius, center[1] - radius))
+        x1, y1 = self._cell_of((center[0] + radius, center[1] + radius))
+        return self._cells_in(x0, y0, x1, y1)
+
+    def _cells_in(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        buckets = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    buckets.append(bucket)
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        if len(buckets) == 1:
+            return np.asarray(buckets[0], dtype=np.int64)
+        return np.concatenate([np.asarray(b, dtype=np.int64) for b in buckets])
+
+    def _bulk_load(self, points: np.ndarray):
+        n = len(points)
+        self._points = np.zeros((max(16, n), 2), dtype=np.float64)
+        self._points[:n] = points
+        self._count = n
+
+        # Group indices by cell with one sort instead of n dict lookups
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        sorted_cells = cells[order]
+        breaks = np.flatnonzero((np.diff(sorted_cells, axis=0) != 0).any(axis=1)) + 1
+        for group in np.split(order, breaks):
+            cx, cy = cells[group[0]]
+            self._cells[(int(cx), int(cy))] = np.sort(group).tolist()
@@ -0,0 +1,135 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+# Drone status codes stored in DroneFleet.status
+IDLE = 0
+MOVING = 1      # En route to a survivor
+RETURNING = 2   # Heading back to home (reload or mission end)
+COMPLETED = 3
+
+STATUS_NAMES = {IDLE: "idle", MOVING: "moving", RETURNING: "returning", COMPLETED: "completed"}
+
+
+class SurvivorState:
+    """
+    Structure-of-arrays state for the survivors found in the source image.
+    Index i in every array refers to the same survivor.
+    """
+
+    def __init__(self, positions: Sequence[Tuple[int, int]], boxes: Sequence[Tuple[int, int, int, int]]):
+        self.pos = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.box = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        n = len(self.pos)
+        self.detected = np.zeros(n, dtype=bool)
+        self.dispatched = np.zeros(n, dtype=bool)  # Got its own delivery site
+        self.delivered = np.zeros(n, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def mark_detected(self, candidates: np.ndarray) -> np.ndarray:
+        """Marks candidate survivors as detected and returns the ones that were not detected before."""
+        new = candidates[~self.detected[candidates]]
+        self.detected[new] = True
+        return new
+
+
+class DroneFleet:
+    """
+    Structure-of-arrays state for a group of drones sharing the same speed.
+
+    Waypoints of every drone live in one flat buffer; each drone only keeps an
+    offset, a length and a cursor into it, so a tick gathers all current targets
+    and advances every moving drone with a handful of vectorized operations.
+    """
+
+    def __init__(self, speed: float, capacity: int = 16):
+        self.speed = float(speed)
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.survivor_idx = np.full(capacity, -1, dtype=np.int64)
+        self.path_start = np.zeros(capacity, dtype=np.int64)
+        self.path_len = np.zeros(capacity, dtype=np.int64)
+        self.cursor = np.zeros(capacity, dtype=np.int64)
+        self.distance = np.zeros(capacity, dtype=np.float64) # Pixels flown so far
+        self.idle_ticks = np.zeros(capacity, dtype=np.int64) # Ticks spent waiting for work
+        self._waypoints = np.zeros((256, 2), dtype=np.float64)
+        self._wp_count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, pos, status: int = IDLE, path: Optional[np.ndarray] = None, survivor_idx: int = -1) -> int:
+        if self.count == len(self.pos):
+            self._grow_drones(2 * len(self.pos))
+        i = self.count
+        self.count += 1
+        self.pos[i] = pos
+        self.status[i] = status
+        self.survivor_idx[i] = survivor_idx
+        self.path_len[i] = 0
+        self.cursor[i] = 0
+        if path is not None:
+            self.set_path(i, path)
+        return i
+
+    def set_path(self, i: int, path: np.ndarray, reverse: bool = False):
+        path = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+        if reverse:
+            path = path[::-1]
+        needed = self._wp_count + len(path)
+        if needed > len(self._waypoints):
+            grown = np.zeros((max(needed, 2 * len(self._waypoints)), 2), dtype=np.float64)
+            grown[:self._wp_count] = self._waypoints[:self._wp_count]
+            self._waypoints = grown
+        self._waypoints[self._wp_count:needed] = path
+        self.path_start[i] = self._wp_count
+        self.path_len[i] = len(path)
+        self.cursor[i] = 0
+        self._wp_count = needed
+
+    def path(self, i: int) -> np.ndarray:
+        start = self.path_start[i]
+        return self._waypoints[start:start + self.path_len[i]]
+
+    def finished_path(self, i: int) -> bool:
+        return bool(self.cursor[i] >= self.path_len[i])
+
+    def step(self) -> np.ndarray:
+        """
+        Advances every moving/returning drone one tick along its path.
+        Returns indices of drones that were already at the end of their path
+        (they do not move this tick; the caller decides what happens next).
+        """
+        n = self.count
+        status = self.status[:n]
+        self.idle_ticks[:n] += status == IDLE
+        active = (status == MOVING) | (status == RETURNING)
+        at_end = self.cursor[:n] >= self.path_len[:n]
+        arrived = np.flatnonzero(active & at_end)
+        moving = np.flatnonzero(active & ~at_end)
+        if moving.size == 0:
+            return arrived
+
+        targets = self._waypoints[self.path_start[moving] + self.cursor[moving]]
+        delta = targets - self.pos[moving]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        snap = dist < self.speed
+
+        # Drones close enough snap onto the waypoint and advance their cursor,
+        # the rest move `speed` pixels along the direction to it.
+        scale = np.where(snap, 1.0, self.speed / np.where(snap, 1.0, dist))
+        self.pos[moving] += delta * scale[:, None]
+        snapped = moving[snap]
+        self.pos[snapped] = targets[snap]
+        self.cursor[snapped] += 1
+        self.distance[moving] += np.minimum(dist, self.speed)
+        return arrived
+
+    def _grow_drones(self, capacity: int):
+        for name in ("pos", "status", "survivor_idx", "path_start", "path_len", "cursor", "distance", "idle_ticks"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
@@ -0,0 +1,93 @@
+import cv2
+import queue
+import threading
+from typing import Optional, Tuple
+
+_STOP = object()
+
+
+class VideoSink:
+    """
+    Streams frames into an MP4 file.
+    Frames are handed to a background encoder thread through a bounded queue,
+    so rendering and encoding overlap while at most `queue_size` frames are
+    held in memory. `write` blocks when the encoder falls behind.
+    """
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], queue_size: int = 4):
+        self.path = path
+        self.frames_written = 0
+        self._writer = self._open_writer(path, fps, size)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._free: "queue.Queue" = queue.Queue() # Recycled buffers for write_copy
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _open_writer(path, fps, size):
+        # Try avc1 (H.264) first, which is browser friendly
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'avc1'), fps, size)
+        if not writer.isOpened():
+            print("Warning: avc1 codec not available, falling back to mp4v")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        if not writer.isOpened():
+            raise RuntimeError("Could not open VideoWriter with avc1 or mp4v")
+        return writer
+
+    def write(self, frame):
+        """Queues a frame for encoding. The sink takes ownership of the array."""
+        if self._error is not None:
+            raise RuntimeError("Video encoder failed") from self._error
+        self._queue.put((frame, False))
+
+    def write_copy(self, frame):
+        """
+        Queues a snapshot of a frame the caller keeps drawing on.
+        Buffers are recycled once encoded, so steady state allocates nothing.
+        """
+        if self._error is not None:
+            raise RuntimeError("Video encoder failed") from self._error
+        try:
+            buffer = self._free.get_nowait()
+            if buffer.shape != frame.shape:
+                buffer = frame.copy()
+            else:
+                buffer[...] = frame
+        except queue.Empty:
+            buffer = frame.copy()
+        self._queue.put((buffer, True))
+
+    def close(self):
+        """Flushes pending frames, stops the encoder and releases the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.release()
+        if self._error is not None:
+            raise RuntimeError("Video encoder failed") from self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _encode_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            frame, pooled = item
+            if self._error is not None:
+                continue  # Keep draining so producers never block on a dead encoder
+            try:
+                self._writer.write(frame)
+                self.frames_written += 1
+            except BaseException as e:
+                self._error = e
+            if pooled:
+                self._free.put(frame)
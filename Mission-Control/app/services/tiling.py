@@ -0,0 +1,118 @@
+"""
+Sliced inference for high-resolution aerial frames.
+
+The detector is trained at 640 px, so a whole 4K frame is shrunk ~6x before YOLO sees
+it and people seen from altitude drop to a few pixels. Instead the frame is cut into
+overlapping model-sized tiles (plus one downscaled full view for large, close-up
+people), every tile is detected at native resolution, and the boxes are shifted back
+to frame coordinates and merged across tiles.
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+MERGE_THRESHOLD = 0.5 # Intersection over the smaller box above which two same-class boxes are one object
+
+
+def tile_windows(width: int, height: int, tile_size: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """(x1, y1, x2, y2) windows of tile_size covering the frame; the last row/column is aligned to the edge."""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = max(1, int(tile_size * (1 - overlap)))
+        positions = list(range(0, length - tile_size, stride))
+        return positions + [length - tile_size]
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def merge_boxes(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray,
+                threshold: float = MERGE_THRESHOLD) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Greedy per-class non-maximum merging across tiles. Returns the kept indices by
+    descending confidence and their boxes grown to the union of the boxes they absorbed.
+    Overlap is measured against the smaller box, so a person cut at a tile border (a
+    fragment inside the box from the neighbouring tile) is merged as well, and the
+    union restores its full extent.
+    """
+    order = np.argsort(-conf, kind="stable")
+    areas = np.prod(np.clip(xyxy[:, 2:] - xyxy[:, :2], 0, None), axis=1)
+    keep, boxes = [], []
+    while len(order):
+        i, rest = order[0], order[1:]
+        tl = np.maximum(xyxy[i, :2], xyxy[rest, :2])
+        br = np.minimum(xyxy[i, 2:], xyxy[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        same = (inter / smaller > threshold) & (cls[rest] == cls[i])
+        group = np.concatenate([[i], rest[same]])
+        keep.append(i)
+        boxes.append(np.concatenate([xyxy[group, :2].min(axis=0), xyxy[group, 2:].max(axis=0)]))
+        order = rest[~same]
+    return np.asarray(keep, dtype=np.int64), np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+class Detections:
+    """Boxes in full-frame pixel coordinates: xyxy (n, 4), conf (n,), cls (n,)."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray,
+                 names: Optional[Dict[int, str]] = None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls, dtype=np.int64).reshape(-1)
+        self.names = names or {}
+
+    def __len__(self):
+        return len(self.conf)
+
+    @classmethod
+    def from_results(cls, results, offsets=None, scales=None) -> "Detections":
+        """Concatenates ultralytics Results, mapping each back by its (x, y) offset and scale."""
+        xyxy, conf, classes, names = [], [], [], {}
+        for k, result in enumerate(results):
+            boxes = result.boxes
+            if not len(boxes):
+                continue
+            b = boxes.xyxy.cpu().numpy().astype(np.float32)
+            if scales is not None:
+                b *= scales[k]
+            if offsets is not None:
+                b += np.tile(np.asarray(offsets[k], dtype=np.float32), 2)
+            xyxy.append(b)
+            conf.append(boxes.conf.cpu().numpy())
+            classes.append(boxes.cls.cpu().numpy())
+            names = result.names or names
+        if not xyxy:
+            return cls(np.empty((0, 4)), np.empty(0), np.empty(0), names)
+        return cls(np.concatenate(xyxy), np.concatenate(conf), np.concatenate(classes), names)
+
+    def merged(self, threshold: float = MERGE_THRESHOLD) -> "Detections":
+        keep, boxes = merge_boxes(self.xyxy, self.conf, self.cls, threshold)
+        return Detections(boxes, self.conf[keep], self.cls[keep], self.names)
+
+    def plot(self, frame: np.ndarray) -> np.ndarray:
+        """Annotated copy of the frame."""
+        annotated = frame.copy()
+        for (x1, y1, x2, y2), conf, c in zip(self.xyxy.astype(int), self.conf, self.cls):
+            color = (0, 0, 255) if c == 0 else (255, 128, 0)
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+            label = f"{self.names.get(int(c), int(c))} {conf:.2f}"
+            cv2.putText(annotated, label, (x1, max(12, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return annotated
+
+
+def slice_frame(frame: np.ndarray, tile_size: int, overlap: float, full_view: bool = True):
+    """Tiles (views into the frame) with their (x, y) offsets and box scales for from_results()."""
+    h, w = frame.shape[:2]
+    windows = tile_windows(w, h, tile_size, overlap)
+    tiles = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+    offsets = [(x1, y1) for x1, y1, _, _ in windows]
+    scales = [1.0] * len(tiles)
+    if full_view and len(tiles) > 1:
+        # Downscaled whole frame so people larger than a tile are still found in one piece
+        scale = tile_size / max(w, h)
+        tiles.append(cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA))
+        offsets.append((0, 0))
+        scales.append(1 / scale)
+    return tiles, offsets, scales
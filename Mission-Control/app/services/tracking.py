@@ -0,0 +1,125 @@
+"""
+Person tracking between detection and the mission coordinator.
+
+Detections are associated frame to frame by IoU, falling back to centroid distance
+for small boxes that move further than their own size between inferred frames. Each
+physical person keeps one track id, so the detector registers a survivor once per
+track and only re-saves its crop when the confidence clearly improves.
+"""
+import itertools
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+CONFIRMED = "confirmed" # Track just reached min_hits: register it
+IMPROVED = "improved" # Registered track seen with clearly higher confidence: refresh its crop
+
+
+class Track:
+    def __init__(self, track_id: int, box: np.ndarray, conf: float, now: float):
+        self.id = track_id
+        self.box = box
+        self.conf = conf
+        self.best_conf = conf # Confidence of the crop saved for this track
+        self.hits = 1
+        self.last_seen = now
+        self.survivor_id: Optional[int] = None
+
+    @property
+    def confirmed(self) -> bool:
+        return self.survivor_id is not None
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (n, 4) and (m, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class IoUTracker:
+    """
+    Greedy IoU tracker for one camera stream.
+    iou_threshold: minimum overlap to continue a track; below it a detection still matches
+        when its centre is within one track-box diagonal of the track's centre.
+    max_age: seconds a track survives without detections (inferred frames may be sparse).
+    min_hits: detections before a track is reported as CONFIRMED, filtering one-frame false positives.
+    improvement: confidence gain over the saved crop that reports IMPROVED.
+    """
+
+    def __init__(self, iou_threshold: float = settings.TRACK_IOU_THRESHOLD, max_age: float = settings.TRACK_MAX_AGE,
+                 min_hits: int = settings.TRACK_MIN_HITS, improvement: float = settings.TRACK_CONF_IMPROVEMENT):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.improvement = improvement
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes: np.ndarray, confs: np.ndarray, now: Optional[float] = None) -> List[Tuple[Track, int, str]]:
+        """
+        Associates this frame's detections with the tracks.
+        Returns (track, detection index, CONFIRMED | IMPROVED) for tracks that need action.
+        """
+        now = time.monotonic() if now is None else now
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+
+        matches = self._match(boxes)
+        events = []
+        matched = set()
+        for t, d in matches:
+            track = self.tracks[t]
+            matched.add(d)
+            track.box, track.conf, track.last_seen = boxes[d], float(confs[d]), now
+            track.hits += 1
+            if not track.confirmed:
+                track.best_conf = max(track.best_conf, track.conf)
+                if track.hits >= self.min_hits:
+                    events.append((track, d, CONFIRMED))
+            elif track.conf >= track.best_conf + self.improvement:
+                track.best_conf = track.conf
+                events.append((track, d, IMPROVED))
+
+        for d in range(len(boxes)):
+            if d not in matched:
+                track = Track(next(self._ids), boxes[d], float(confs[d]), now)
+                self.tracks.append(track)
+                if self.min_hits <= 1:
+                    events.append((track, d, CONFIRMED))
+        return events
+
+    def _match(self, boxes: np.ndarray) -> List[Tuple[int, int]]:
+        if not self.tracks or not len(boxes):
+            return []
+        track_boxes = np.stack([t.box for t in self.tracks])
+        score = box_iou(track_boxes, boxes)
+
+        # Centroid fallback, scored below any IoU match
+        tc = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        dc = (boxes[:, :2] + boxes[:, 2:]) / 2
+        dist = np.linalg.norm(tc[:, None] - dc[None], axis=2)
+        diag = np.maximum(np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1), 1e-9)[:, None]
+        near = (score < self.iou_threshold) & (dist < diag)
+        score = np.where(score >= self.iou_threshold, 1.0 + score, np.where(near, 1.0 - dist / diag, 0.0))
+
+        pairs = []
+        used_t, used_d = set(), set()
+        for flat in np.argsort(-score, axis=None):
+            t, d = divmod(int(flat), score.shape[1])
+            if score[t, d] <= 0:
+                break
+            if t in used_t or d in used_d:
+                continue
+            used_t.add(t)
+            used_d.add(d)
+            pairs.append((t, d))
+        return pairs
+
+    def active(self) -> int:
+        return len(self.tracks)
@@ -0,0 +1,200 @@
+"""
+Capacitated multi-trip delivery planning (CVRP).
+
+Route first, cluster second: one giant TSP tour over every survivor is split
+optimally into depot-to-depot trips that respect kit capacity and flight range,
+each trip is re-optimized on its own, and trips are then scheduled across the
+delivery drones so the summed delivery latency stays low.
+Distances are in the units of the input points (pixels in the simulator,
+metres live; see latlon_to_metres).
+"""
+import math
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from pydantic import BaseModel
+from app.services.planner import solve_tsp_route
+
+EARTH_RADIUS = 6371000.0 # metres
+TIME_BUDGET = 0.2 # Seconds of TSP local search for the giant tour
+
+
+class Trip(BaseModel):
+    drone: int
+    stops: List[int] # Indices into the planned points, in visiting order
+    from_start: bool = False # Leaves from the drone's current position instead of the depot
+    distance: float # First leg to the last stop and back to the depot
+    departure: float # Distance the drone has flown in this plan when the trip begins
+    arrivals: List[float] # Distance flown in this plan when each stop is reached
+
+
+class DeliveryPlan(BaseModel):
+    trips: List[Trip] = []
+    total_distance: float = 0.0
+    mean_latency: Optional[float] = None # Mean distance flown before a stop is served
+    unserved: List[int] = [] # Points no trip can reach within capacity/range
+
+    def drone_trips(self, drone: int) -> List[Trip]:
+        return [t for t in self.trips if t.drone == drone]
+
+
+def latlon_to_metres(points: Sequence[Tuple[float, float]], origin: Tuple[float, float]) -> np.ndarray:
+    """Equirectangular projection of (lat, lon) points around `origin`; accurate over a mission area."""
+    pts = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lat0, lon0 = np.radians(origin)
+    x = (pts[:, 1] - lon0) * math.cos(lat0) * EARTH_RADIUS
+    y = (pts[:, 0] - lat0) * EARTH_RADIUS
+    return np.column_stack([x, y])
+
+
+def plan_deliveries(depot: Tuple[float, float], points: Sequence[Tuple[float, float]], capacity: int,
+                    max_distance: Optional[float] = None, drones: int = 1, demands: Optional[Sequence[int]] = None,
+                    start: Optional[Tuple[float, float]] = None, start_kits: Optional[int] = None,
+                    start_range: Optional[float] = None, time_budget: float = TIME_BUDGET,
+                    tour: Optional[Sequence[int]] = None) -> DeliveryPlan:
+    """
+    Splits `points` into depot-to-depot trips for `drones` identical drones.
+    capacity: kits per trip; demands: kits per point (default 1 each).
+    max_distance: flight range per trip (battery), None for unlimited.
+    start/start_kits/start_range: drone 0 is already out at `start` with that many kits and
+        that much range left. Its first trip may leave from there (from_start), otherwise it
+        flies home first and the plan's distances include that leg.
+    tour: an existing visiting order over all points (e.g. from an IncrementalTour) to split
+        instead of solving a new giant tour.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    depot = np.asarray(depot, dtype=np.float64)
+    n = len(pts)
+    dem = np.ones(n, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    to_depot = np.hypot(pts[:, 0] - depot[0], pts[:, 1] - depot[1])
+
+    servable = dem <= capacity
+    if max_distance is not None:
+        servable &= 2 * to_depot <= max_distance
+    unserved = np.flatnonzero(~servable).tolist()
+    served = np.flatnonzero(servable)
+    if not len(served):
+        return DeliveryPlan(unserved=unserved)
+
+    # 1. Giant tour: a closed tour through the depot, or an open one from the drone's position
+    if tour is not None:
+        seq = np.asarray([i for i in tour if servable[i]], dtype=np.int64)
+    else:
+        if start is not None:
+            order, _ = solve_tsp_route([tuple(start)] + pts[served].tolist(), 0, time_budget=time_budget)
+        else:
+            order, _ = solve_tsp_route([tuple(depot)] + pts[served].tolist(), 0, return_to_start=True,
+                                       time_budget=time_budget)
+        seq = served[np.asarray(order[1:], dtype=np.int64) - 1]
+
+    # 2. Optimal split of the tour into feasible trips (shortest total distance)
+    if start is not None:
+        start = np.asarray(start, dtype=np.float64)
+    segments = _split(pts, dem, to_depot, seq, capacity, max_distance, start, start_kits, start_range, depot)
+
+    # 3. Re-optimize each depot trip on its own and orient it for the earliest arrivals
+    trips = []
+    for stops, from_start in segments:
+        if not from_start and len(stops) > 3:
+            trip_order, _ = solve_tsp_route([tuple(depot)] + pts[stops].tolist(), 0, return_to_start=True,
+                                            time_budget=time_budget)
+            stops = [stops[i - 1] for i in trip_order[1:]]
+        origin = start if from_start else depot
+        if not from_start:
+            reverse = stops[::-1]
+            if _weighted_arrival(pts, dem, origin, reverse) < _weighted_arrival(pts, dem, origin, stops):
+                stops = reverse
+        trips.append((stops, from_start, origin))
+
+    return _schedule(pts, dem, depot, trips, drones, start, unserved)
+
+
+def _split(pts, dem, to_depot, seq, capacity, max_distance, start, start_kits, start_range, depot):
+    """Prins' split: shortest-path DP over tour positions; arc i -> j is one trip serving seq[i:j]."""
+    m = len(seq)
+    best = np.full(m + 1, np.inf)
+    pred = [None] * (m + 1)
+    best[0] = 0.0
+
+    def relax(i, origin, cap, reach, base, from_start):
+        load, dist = 0, 0.0
+        for j in range(i, m):
+            p = seq[j]
+            load += dem[p]
+            prev = origin if j == i else pts[seq[j - 1]]
+            dist += math.hypot(pts[p, 0] - prev[0], pts[p, 1] - prev[1])
+            cost = dist + to_depot[p]
+            if load > cap or (reach is not None and cost > reach):
+                break
+            if base + cost < best[j + 1]:
+                best[j + 1] = base + cost
+                pred[j + 1] = (i, from_start)
+
+    for i in range(m):
+        if i == 0 and start is not None:
+            kits = capacity if start_kits is None else start_kits
+            reach = max_distance if start_range is None else start_range
+            relax(0, start, kits, reach, 0.0, True)
+            # Or fly home first and start a fresh trip from the depot
+            relax(0, depot, capacity, max_distance, math.hypot(start[0] - depot[0], start[1] - depot[1]), False)
+        elif np.isfinite(best[i]):
+            relax(i, depot, capacity, max_distance, best[i], False)
+
+    segments = []
+    j = m
+    while j > 0:
+        i, from_start = pred[j]
+        segments.append((seq[i:j].tolist(), from_start))
+        j = i
+    return segments[::-1]
+
+
+def _legs(pts, origin, stops):
+    path = np.vstack([origin, pts[stops]])
+    seg = np.diff(path, axis=0)
+    return np.cumsum(np.hypot(seg[:, 0], seg[:, 1]))
+
+
+def _weighted_arrival(pts, dem, origin, stops) -> float:
+    return float((_legs(pts, origin, stops) * dem[stops]).sum())
+
+
+def _schedule(pts, dem, depot, trips, drones, start, unserved) -> DeliveryPlan:
+    """
+    Assigns trips to drones. A trip from the drone's current position goes first on drone 0;
+    the rest follow Smith's rule (shortest trip per kit first), each on the drone that
+    frees up earliest, which keeps the summed arrival times low.
+    """
+    clocks = [0.0] * max(1, drones)
+    first = [t for t in trips if t[1]]
+    rest = [t for t in trips if not t[1]]
+    if start is not None and not first:
+        clocks[0] = float(np.hypot(*(start - depot))) # Flies home first
+
+    def trip_info(stops, origin):
+        legs = _legs(pts, origin, stops)
+        return legs, float(legs[-1] + np.hypot(*(pts[stops[-1]] - depot)))
+
+    planned = []
+    for stops, from_start, origin in first:
+        legs, distance = trip_info(stops, origin)
+        planned.append(Trip(drone=0, stops=stops, from_start=True, distance=distance,
+                            departure=0.0, arrivals=legs.tolist()))
+        clocks[0] = distance
+
+    infos = [(stops, *trip_info(stops, origin)) for stops, _, origin in rest]
+    infos.sort(key=lambda info: info[2] / dem[info[0]].sum())
+    for stops, legs, distance in infos:
+        drone = int(np.argmin(clocks))
+        departure = clocks[drone]
+        planned.append(Trip(drone=drone, stops=stops, distance=distance, departure=departure,
+                            arrivals=(legs + departure).tolist()))
+        clocks[drone] += distance
+
+    planned.sort(key=lambda t: (t.departure, t.drone))
+    arrivals = [a for t in planned for a, s in zip(t.arrivals, t.stops) for _ in range(int(dem[s]))]
+    return DeliveryPlan(
+        trips=planned,
+        total_distance=float(sum(clocks)),
+        mean_latency=float(np.mean(arrivals)) if arrivals else None,
+        unserved=unserved,
+    )
@@ -0,0 +1,12 @@
+import os
+import sys
+import pytest
+
+# Tests import the app the way run.py does, from the Mission-Control directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    # mission_control.db and user_settings.json are opened relative to the working directory
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from app.api.endpoints import router
+from app.core.database import get_session
+from app.models.models import Survivor, utc_now
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mission.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    def session():
+        with Session(engine) as s:
+            yield s
+
+    app.dependency_overrides[get_session] = session
+    return TestClient(app)
+
+
+def _add(engine, updated_at, count=1):
+    with Session(engine) as session:
+        for _ in range(count):
+            session.add(Survivor(lat=1.0, lon=2.0, confidence=0.5, detected_at=updated_at, updated_at=updated_at))
+        session.commit()
+
+
+def _follow(client, params):
+    """Survivor ids per page, following the since/since_id cursor until has_more is false."""
+    pages = []
+    while True:
+        body = client.get("/api/status", params=params).json()
+        pages.append([s["id"] for s in body["survivors"]])
+        if not body["has_more"]:
+            return pages, body
+        params = {"since": body["next_since"], "since_id": body["next_since_id"], "limit": params["limit"]}
+
+
+def test_since_cursor_returns_rows_updated_between_pages(client, engine):
+    for i in range(5):
+        _add(engine, T0 + timedelta(seconds=i + 1))
+
+    first = client.get("/api/status", params={"since": T0.isoformat(), "limit": 2}).json()
+    assert [s["id"] for s in first["survivors"]] == [1, 2]
+    # Survivor 1 (already seen, lowest id) changes before the next page is read
+    with Session(engine) as session:
+        survivor = session.get(Survivor, 1)
+        survivor.updated_at = T0 + timedelta(seconds=10)
+        session.add(survivor)
+        session.commit()
+
+    pages, _ = _follow(client, {"since": first["next_since"], "since_id": first["next_since_id"], "limit": 2})
+    assert pages == [[3, 4], [5, 1]]
+
+
+def test_since_cursor_pages_through_rows_sharing_a_timestamp(client, engine):
+    _add(engine, T0 + timedelta(seconds=1), count=5)
+    pages, last = _follow(client, {"since": T0.isoformat(), "limit": 2})
+    assert pages == [[1, 2], [3, 4], [5]]
+    # Polling again from the final cursor returns nothing new
+    again = client.get("/api/status", params={"since": last["next_since"], "since_id": last["next_since_id"]}).json()
+    assert again["survivors"] == []
+
+
+def test_id_pages_carry_no_time_cursor(client, engine):
+    _add(engine, T0, count=3)
+    body = client.get("/api/status", params={"since_id": 1, "limit": 1}).json()
+    assert [s["id"] for s in body["survivors"]] == [2]
+    assert body["next_since_id"] == 2 and body["next_since"] is None
+
+
+def test_stream_ids_are_restricted_to_safe_names(client):
+    for stream_id in ("../escape", "a/b", "with space", "", "x" * 33):
+        response = client.post("/api/streams", json={"stream_id": stream_id, "source": "missing.mp4"})
+        assert response.status_code == 422, stream_id
+
+
+@pytest.mark.parametrize("suffix", ["+00:00", "Z", "+02:00", ""])
+def test_since_cursor_with_default_timestamps(client, engine, suffix):
+    with Session(engine) as session:
+        session.add_all([Survivor(lat=1.0, lon=2.0, confidence=0.5) for _ in range(3)]) # Production defaults
+        session.commit()
+    start = datetime.now(timezone.utc) - timedelta(minutes=5)
+    if suffix == "+02:00":
+        start = start.astimezone(timezone(timedelta(hours=2)))
+    since = start.replace(tzinfo=None).isoformat() + suffix
+
+    pages, last = _follow(client, {"since": since, "limit": 2})
+    assert pages == [[1, 2], [3]]
+    # A row changed after the cursor comes back on the next poll, and only that row
+    with Session(engine) as session:
+        survivor = session.get(Survivor, 2)
+        survivor.confidence, survivor.updated_at = 0.9, utc_now()
+        session.add(survivor)
+        session.commit()
+    pages, _ = _follow(client, {"since": last["next_since"], "since_id": last["next_since_id"], "limit": 2})
+    assert pages == [[2]]
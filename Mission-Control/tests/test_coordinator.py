@@ -0,0 +1,37 @@
+from app.services.mission import coordinator as coordinator_module
+from app.services.mission.coordinator import MissionCoordinator
+
+
+def test_plan_is_rebuilt_only_when_the_tour_changes(monkeypatch):
+    coordinator = MissionCoordinator()
+    coordinator._route_loaded = True # Start from an empty tour instead of the database
+    plan_deliveries, calls = coordinator_module.plan_deliveries, []
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return plan_deliveries(*args, **kwargs)
+
+    monkeypatch.setattr(coordinator_module, "plan_deliveries", counting)
+    for i in range(6):
+        coordinator.route.add(i, (40.0 * i, 25.0))
+
+    first = coordinator.current_plan()
+    assert coordinator.current_plan() is first
+    assert len(calls) == 1
+
+    coordinator.route.add(9, (10.0, 90.0))
+    order, _, plan = coordinator.current_plan()
+    assert len(calls) == 2
+    assert sorted(order) == [0, 1, 2, 3, 4, 5, 9]
+    assert sorted(order[i] for trip in plan.trips for i in trip.stops) == sorted(order)
+
+
+def test_survivors_given_up_by_persistence_are_forgotten():
+    coordinator = MissionCoordinator()
+    coordinator._route_loaded = coordinator._index_loaded = True
+    coordinator._index.add(3, 10.0, 10.0, 0.6)
+    coordinator.route.add(3, (10.0, 10.0))
+
+    coordinator._forget_survivors([3])
+    assert coordinator._index.nearest(10.0, 10.0) is None
+    assert 3 not in coordinator.route
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.core import database
+from app.models.models import MissionLog, utc_now
+
+
+def test_prune_logs_removes_old_and_excess_rows(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mission.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    now = utc_now()
+    with Session(engine) as session:
+        session.add_all([MissionLog(message=f"old {i}", timestamp=now - timedelta(days=10)) for i in range(3)])
+        session.add_all([MissionLog(message=f"new {i}") for i in range(5)]) # Default timestamps
+        session.commit()
+
+    assert database.prune_logs(max_age_days=7, max_rows=3) == 5
+    with Session(engine) as session:
+        assert [log.message for log in session.exec(select(MissionLog).order_by(MissionLog.id))] == \
+            ["new 2", "new 3", "new 4"]
+    assert database.maintain_database() == 0 # Nothing left to prune; checkpoint and optimize still run
@@ -0,0 +1,96 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models.models import MissionLog, Survivor
+from app.services import persistence as persistence_module
+from app.services.persistence import PersistenceWorker
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mission.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(persistence_module, "engine", engine)
+    return engine
+
+
+def test_rows_built_from_defaults_are_persisted(engine):
+    worker = PersistenceWorker(flush_interval=0.05)
+    worker.insert_survivor(Survivor(id=1, lat=1.0, lon=2.0, confidence=0.8))
+    worker.add_log("hello")
+    assert worker.flush()
+    worker.update_survivor(1, confidence=0.9)
+    assert worker.flush()
+    worker.stop()
+
+    with Session(engine) as session:
+        assert session.get(Survivor, 1).confidence == 0.9
+        assert [log.message for log in session.exec(select(MissionLog)).all()] == ["hello"]
+    stats = worker.stats()
+    assert stats["written"] == 3 and stats["failed"] == 0 and stats["requeued"] == 0
+
+
+def test_failing_log_write_keeps_survivors(engine):
+    worker = PersistenceWorker(flush_interval=0.05, retries=2)
+    worker.insert_survivor(Survivor(id=1, lat=1.0, lon=2.0, confidence=0.8))
+    worker.insert_survivor(Survivor(id=2, lat=1.1, lon=2.1, confidence=0.6))
+    worker.add_log(None) # Violates MissionLog.message NOT NULL, failing the log transaction
+    assert worker.flush()
+    worker.stop()
+
+    with Session(engine) as session:
+        assert sorted(s.id for s in session.exec(select(Survivor)).all()) == [1, 2]
+        assert session.exec(select(MissionLog)).all() == []
+    assert worker.stats()["failed"] == 1
+
+
+def test_failed_survivor_write_is_queued_again(engine, monkeypatch):
+    worker = PersistenceWorker(flush_interval=0.05, retries=1)
+    commit = worker._commit_survivors
+    failures = iter([True, True]) # The batch attempt and the row-by-row retry
+
+    def flaky(inserts, updates):
+        if next(failures, False):
+            raise RuntimeError("database is locked")
+        return commit(inserts, updates)
+
+    monkeypatch.setattr(worker, "_commit_survivors", flaky)
+    worker.insert_survivor(Survivor(id=7, lat=1.0, lon=2.0, confidence=0.5))
+    assert worker.flush()
+    worker.stop()
+
+    with Session(engine) as session:
+        assert session.get(Survivor, 7) is not None
+    assert worker.stats()["requeued"] == 1
+
+
+def test_row_that_always_fails_is_dropped_after_max_attempts(engine, monkeypatch):
+    worker = PersistenceWorker(flush_interval=0.01, retries=1, max_attempts=3)
+    commit, dropped = worker._commit_survivors, []
+
+    def reject_seven(inserts, updates):
+        if any(s.id == 7 for s in inserts):
+            raise RuntimeError("constraint failed")
+        return commit(inserts, updates)
+
+    monkeypatch.setattr(worker, "_commit_survivors", reject_seven)
+    worker.add_drop_listener(dropped.extend)
+    worker.insert_survivor(Survivor(id=7, lat=1.0, lon=2.0, confidence=0.5))
+    worker.insert_survivor(Survivor(id=8, lat=1.5, lon=2.5, confidence=0.5))
+    assert worker.flush()
+    worker.stop()
+
+    with Session(engine) as session:
+        assert session.get(Survivor, 7) is None and session.get(Survivor, 8) is not None
+    stats = worker.stats()
+    assert dropped == [7] and stats["dropped_survivors"] == 1 and stats["requeued"] == 2
+
+
+def test_survivor_backlog_is_bounded(engine):
+    worker = PersistenceWorker(flush_interval=60, batch_size=100, max_pending=2)
+    assert worker.insert_survivor(Survivor(id=1, lat=1.0, lon=2.0, confidence=0.5))
+    assert worker.update_survivor(5, confidence=0.7)
+    assert not worker.insert_survivor(Survivor(id=2, lat=1.0, lon=2.0, confidence=0.5))
+    assert not worker.update_survivor(6, confidence=0.7)
+    assert worker.update_survivor(1, confidence=0.9) # Folds into the waiting insert
+    assert worker.stats()["dropped_survivors"] == 2
+    worker.stop()
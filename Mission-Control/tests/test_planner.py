@@ -0,0 +1,60 @@
+import time
+import numpy as np
+from app.services.planner import TIME_BUDGET, IncrementalTour, neighbour_lists, route_length, solve_tsp_route
+
+
+def _brute_force_tour(pts: np.ndarray) -> list:
+    # Plain nearest neighbour over full distance rows, as solve_tsp did originally
+    visited = np.zeros(len(pts), dtype=bool)
+    tour, current = [0], 0
+    visited[0] = True
+    for _ in range(len(pts) - 1):
+        d = np.hypot(pts[:, 0] - pts[current, 0], pts[:, 1] - pts[current, 1])
+        d[visited] = np.inf
+        current = int(np.argmin(d))
+        visited[current] = True
+        tour.append(current)
+    return tour
+
+
+def test_neighbour_lists_match_brute_force():
+    rng = np.random.default_rng(1)
+    # A dense cluster with a few far outliers forces the search ring to widen
+    pts = np.vstack([rng.random((400, 2)), [[50.0, 50.0], [50.0, 51.0], [-30.0, 4.0]]])
+    neighbours = neighbour_lists(pts, k=8)
+    d = np.hypot(pts[:, None, 0] - pts[None, :, 0], pts[:, None, 1] - pts[None, :, 1])
+    np.fill_diagonal(d, np.inf)
+    assert np.allclose(np.take_along_axis(d, neighbours, axis=1), np.sort(d, axis=1)[:, :8])
+
+
+def test_large_instance_improves_on_nearest_neighbour_within_budget():
+    rng = np.random.default_rng(0)
+    pts = rng.random((5000, 2)) * 10
+    start = time.perf_counter()
+    tour, length = solve_tsp_route(pts.tolist())
+    elapsed = time.perf_counter() - start
+    assert sorted(tour) == list(range(len(pts))) and tour[0] == 0
+    assert length < 0.95 * route_length(pts, _brute_force_tour(pts))
+    # Construction is near-linear, so the call stays close to the search budget
+    assert elapsed < 2 * TIME_BUDGET
+
+
+def test_incremental_tour_tracks_length_through_adds_and_removes():
+    rng = np.random.default_rng(2)
+    tour = IncrementalTour(improve_every=3)
+    live = {}
+    for _ in range(1500):
+        if live and rng.random() < 0.3:
+            key = int(rng.choice(list(live)))
+            tour.remove(key)
+            del live[key]
+        else:
+            key = int(rng.integers(0, 1000))
+            live[key] = rng.random(2) * 3000
+            tour.add(key, live[key])
+    order = tour.order()
+    assert sorted(order) == sorted(live)
+    pts = np.vstack([[0.0, 0.0]] + [live[key] for key in order])
+    assert np.isclose(tour.length, route_length(pts, list(range(len(pts))), return_to_start=True))
+    _, batch = solve_tsp_route(pts.tolist(), 0, return_to_start=True, time_budget=2.0)
+    assert tour.length < 1.1 * batch
@@ -0,0 +1,25 @@
+import pytest
+from pydantic import ValidationError
+from app.core.settings.models import CameraSettings
+from app.services.rate_control import MIN_FPS, RateController
+from app.services.simulation.params import SimulationParams
+
+
+@pytest.mark.parametrize("model", [CameraSettings, SimulationParams])
+@pytest.mark.parametrize("tiling", [{"tile_overlap": 1.0}, {"tile_overlap": -0.1}, {"tile_size": -640}])
+def test_invalid_tiling_is_rejected(model, tiling):
+    with pytest.raises(ValidationError):
+        model(**tiling)
+
+
+def test_inference_rate_must_be_positive():
+    with pytest.raises(ValidationError):
+        CameraSettings(inference_fps=0)
+
+
+def test_rate_controller_clamps_the_target_rate():
+    controller = RateController(target_fps=0)
+    controller.configure(target_fps=-1, cpu_budget=0.5)
+    assert controller.target_fps == controller.fps_limit == MIN_FPS
+    assert controller.wait_time() >= 0
+    assert controller.stats()["fps_limit"] == MIN_FPS